@@ -1,14 +1,26 @@
 from parapy.core import *
+from parapy.core.globs import Undefined
 from parapy.geom import *
 from parapy.exchange.step import STEPWriter
 from classes.wing_primitives.external.wing import Wing
 from classes.fuselage_primitives.fuselage import Fuselage
 from classes.analysis.scissor_plot import ScissorPlot
+from classes.analysis.aero_database import (AeroDatabase,
+                                            ScatteredAeroDatabase, case_name,
+                                            control_index, refine_samples)
+from classes.analysis.burn_evaluation import BurnEvaluator
+from classes.analysis.fuel_model import FuelModel, TANK_WINGS
+from classes.analysis.tank_scheduler import (EventDrivenScheduler,
+                                             TankScheduler)
+from classes.analysis.trim import LinearTrimModel, TrimSolver
+from classes.wing_primitives.fuel.fuel_tank import FUEL_FIDELITIES
+from tools.avl_cache import AVLCache
+from tools.avl_parallel import run_parallel
 import kbeutils.avl as avl
+import copy
 import os
 import math
 import numpy as np
-from scipy import interpolate
 
 
 class Aircraft(GeomBase):
@@ -424,7 +436,31 @@ class Aircraft(GeomBase):
     avl_delta_e_start = Input(-40.)
     avl_delta_e_end = Input(41.)
     avl_delta_e_step = Input(20.)
+    avl_cache_directory = Input(os.path.join(os.getcwd(), 'output',
+                                             'avl_cache'))
+    avl_cache_refresh = Input(False)
+    avl_n_processes = Input(1, validator=lambda x: isinstance(x, int))
+    avl_grid_mode = Input('uniform', validator=val.OneOf(['uniform',
+                                                          'adaptive']))
+    avl_adaptive_tol = Input(1e-3, validator=val.is_positive)
+    avl_adaptive_max_level = Input(3, validator=lambda x: isinstance(x, int))
     convergence_tol = Input(1e-4)
+    #: The mission profile (see
+    #: :class:`~classes.analysis.mission_profile.MissionProfile`) followed by
+    #: :any:`schedule_fuel_usage`. If None, the whole mission is flown at the
+    #: cruise conditions.
+    mission_profile = Input(None)
+    #: The thrust as a fraction of the thrust of the engines, by which the
+    #: :any:`fuel_flows` are scaled, e.g. per segment of a mission.
+    thrust_setting = Input(1., validator=val.is_positive)
+    #: The fidelity of the fuel model of all tanks: 'point' (the fuel is a
+    #: point mass at the centroid of its tank), 'table' (interpolated level
+    #: tables) or 'exact' (OCC booleans). See :any:`fuel_fidelity_report`.
+    fuel_fidelity = Input('table', validator=val.OneOf(FUEL_FIDELITIES))
+    #: The (increasing) pitch angles in degrees at which the level tables of
+    #: the :any:`fuel_model` are sampled (see :any:`pitch_level_tables`), or
+    #: None for horizontal free surfaces.
+    fuel_pitches = Input(None)
 
     @Part
     def fuselage(self):
@@ -441,6 +477,8 @@ class Aircraft(GeomBase):
     def main_wing_starboard(self):
         return Wing(
             name='main_wing_starboard',
+            tank_fuel_flow=self.fuel_flows['main_wing_starboard'],
+            fuel_fidelity=self.fuel_fidelity,
             location=self.fuselage.point_at_fractions(
                 self.main_wing_long_pos,
                 self.main_wing_trans_pos,
@@ -513,6 +551,8 @@ class Aircraft(GeomBase):
     def main_wing_port(self):
         return Wing(
             name='main_wing_port',
+            tank_fuel_flow=self.fuel_flows['main_wing_port'],
+            fuel_fidelity=self.fuel_fidelity,
             is_starboard=False,
             location=self.fuselage.point_at_fractions(
                 self.main_wing_long_pos,
@@ -586,6 +626,8 @@ class Aircraft(GeomBase):
     def vertical_tail(self):
         return Wing(
             name='vertical_tail',
+            tank_fuel_flow=self.fuel_flows['vertical_tail'],
+            fuel_fidelity=self.fuel_fidelity,
             wing_cant=90.,
             location=translate(self.fuselage.end, 'x_', self.vt_chords[0]),
             is_starboard=False,
@@ -657,6 +699,8 @@ class Aircraft(GeomBase):
     def horizontal_tail_starboard(self):
         return Wing(
             name='horizontal_tail_starboard',
+            tank_fuel_flow=self.fuel_flows['horizontal_tail_starboard'],
+            fuel_fidelity=self.fuel_fidelity,
             location=translate(self.fuselage.point_at_fractions(
                 1.,
                 self.horizontal_tail_trans_pos,
@@ -732,6 +776,8 @@ class Aircraft(GeomBase):
     def horizontal_tail_port(self):
         return Wing(
             name='horizontal_tail_port',
+            tank_fuel_flow=self.fuel_flows['horizontal_tail_port'],
+            fuel_fidelity=self.fuel_fidelity,
             is_starboard=False,
             location=translate(self.fuselage.point_at_fractions(
                 1.,
@@ -891,6 +937,32 @@ class Aircraft(GeomBase):
         return avl.Interface(cases=self.cases,
                              configuration=self.avl_configuration)
 
+    @Attribute
+    def avl_cache(self):
+        """ The on-disk cache of AVL results, or None if caching is disabled
+        (:any:`avl_cache_directory` is None).
+
+        :rtype: tools.avl_cache.AVLCache | None
+        """
+        if self.avl_cache_directory is None:
+            return None
+        return AVLCache(self.avl_cache_directory)
+
+    @Attribute
+    def avl_results(self):
+        """ The AVL results of all :any:`cases`. These are loaded from the
+        :any:`avl_cache` if this configuration has been analysed before,
+        unless :any:`avl_cache_refresh` is set. Otherwise, AVL is run
+        (see :any:`run_avl`).
+
+        :rtype: dict
+        """
+        if self.avl_cache is None:
+            return self.run_avl()
+        return self.avl_cache.get_or_run(self.avl_configuration, self.cases,
+                                         self.run_avl,
+                                         refresh=self.avl_cache_refresh)
+
     @Attribute
     def avl_configuration(self):
         """ The avl configuration of this aircraft, such that it can be
@@ -926,19 +998,126 @@ class Aircraft(GeomBase):
                                   self.main_wing_starboard.mac_position.z)
             )
 
+    @Attribute
+    def avl_CLs(self):
+        """ The lift coefficients at which the AVL cases are run.
+
+        :rtype: numpy.ndarray
+        """
+        return np.arange(self.avl_CL_start, self.avl_CL_end, self.avl_CL_step)
+
+    @Attribute
+    def avl_delta_es(self):
+        """ The elevator deflections at which the AVL cases are run.
+
+        :rtype: numpy.ndarray
+        """
+        return np.arange(self.avl_delta_e_start, self.avl_delta_e_end,
+                         self.avl_delta_e_step)
+
     @Attribute
     def cases(self):
-        return [avl.Case(name='CL_{:.1f}_delta_e_{:.1f}'.format(CL, delta_e),
-                         settings={'alpha': avl.Parameter(name='alpha',
-                                                          value=CL,
-                                                          constraint='CL'),
-                                   'elevator': delta_e})
-                for CL in np.arange(self.avl_CL_start,
-                                    self.avl_CL_end,
-                                    self.avl_CL_step)
-                for delta_e in np.arange(self.avl_delta_e_start,
-                                         self.avl_delta_e_end,
-                                         self.avl_delta_e_step)]
+        return [self.avl_case(CL, delta_e)
+                for CL in self.avl_CLs
+                for delta_e in self.avl_delta_es]
+
+    @Attribute
+    def aero_database(self):
+        """ The database holding the interpolants of the AVL 'Totals'. It is
+        only rebuilt when the AVL results change, i.e. when the aerodynamic
+        configuration or the run cases change. Its cache statistics are
+        available through ``aero_database.cache_info``.
+
+        If :any:`avl_grid_mode` is 'adaptive', the grid of :any:`avl_CLs`
+        and :any:`avl_delta_es` is only the initial (coarse) grid, which is
+        refined where the interpolation error of Cmtot or CDtot exceeds
+        :any:`avl_adaptive_tol` (see
+        :func:`~classes.analysis.aero_database.refine_samples`).
+
+        The database is frozen, as it is shared by all fuel states of this
+        configuration. See :any:`fuel_independent_attributes`.
+
+        :rtype: classes.analysis.aero_database.AeroDatabase
+        """
+        if self.avl_grid_mode == 'adaptive':
+            database = ScatteredAeroDatabase(
+                refine_samples(self.run_avl_points, self.avl_CLs,
+                               self.avl_delta_es,
+                               tolerance=self.avl_adaptive_tol,
+                               max_level=self.avl_adaptive_max_level))
+        else:
+            database = AeroDatabase(
+                self.avl_results, self.avl_CLs, self.avl_delta_es,
+                elevator_index=control_index(self.avl_configuration))
+        return database.freeze()
+
+    @Attribute
+    def fuel_independent_attributes(self):
+        """ The (dotted paths of the) attributes that must not be
+        invalidated by a change of the fuel state: the AVL analysis and its
+        configuration, the aero database, the trim solver and the lofted
+        geometry. Burning fuel should only affect the masses, the centre of
+        gravity and the lift coefficient. Use these paths with an
+        :class:`~tools.invalidation.InvalidationGuard` to verify this.
+
+        :rtype: list[str]
+        """
+        wings = ['main_wing_starboard', 'main_wing_port', 'vertical_tail',
+                 'horizontal_tail_starboard', 'horizontal_tail_port']
+        return (['avl_configuration', 'avl_analysis', 'aero_database',
+                 'trim_solver', 'burn_evaluator', 'fuel_model',
+                 'pitch_level_tables', 'fuselage.solid'] +
+                ['{}.{}'.format(wing, attribute) for wing in wings
+                 for attribute in ('avl_surface', 'closed_solid')] +
+                ['{}.fuel_tanks[{}].{}'.format(wing, i, attribute)
+                 for wing in wings
+                 for i in range(len(getattr(self, wing).fuel_tanks))
+                 for attribute in ('solid', 'fuel_level_table')])
+
+    @Attribute
+    def trim_solver(self):
+        """ The solver used in :any:`trim`. It only depends on the
+        :any:`aero_database`, such that it survives changes of the fuel
+        state and can warm-start from the previous trim solution. Its
+        iteration counts are available through ``trim_solver.stats``.
+
+        :rtype: classes.analysis.trim.TrimSolver
+        """
+        return TrimSolver(self.aero_database, self.convergence_tol)
+
+    @Attribute
+    def burn_evaluator(self):
+        """ The evaluator of hypothetical burns, used in
+        :any:`evaluate_burn`. Like the :any:`trim_solver`, it does not
+        depend on the fuel state.
+
+        :rtype: classes.analysis.burn_evaluation.BurnEvaluator
+        """
+        return BurnEvaluator(self.aero_database, self.trim_solver)
+
+    @Attribute
+    def has_linear_trim_model(self):
+        """ Whether the :any:`aero_database` provides the derivatives of the
+        :any:`linear_trim_model`. A database on scattered points (see
+        :any:`avl_grid_mode`) or a
+        :class:`~classes.analysis.surrogate.SurrogateAeroDatabase` does not,
+        in which case the linear trim falls back to the :any:`trim_solver`.
+
+        :rtype: bool
+        """
+        return getattr(self.aero_database, 'is_regular_grid', True)
+
+    @Attribute
+    def linear_trim_model(self):
+        """ The linearised trim model used in :any:`trim_linear`. Like the
+        :any:`trim_solver`, it only depends on the :any:`aero_database`. It
+        needs the stability and control derivatives, so it is only available
+        for an :any:`aero_database` on a regular grid (see
+        :any:`has_linear_trim_model`).
+
+        :rtype: classes.analysis.trim.LinearTrimModel
+        """
+        return LinearTrimModel(self.aero_database)
 
     @Attribute
     def net_wing_area(self):
@@ -1118,9 +1297,8 @@ class Aircraft(GeomBase):
 
         :rtype: float
         """
-        return sum(tank.fuel.mass
-                   for _child in self.children if hasattr(_child, 'fuel_tanks')
-                   for tank in _child.fuel_tanks if not tank.is_empty)
+        return sum(tank.fuel.mass for tank in self.fuel_tanks
+                   if not tank.is_empty)
 
     @Attribute
     def fuel_cog(self):
@@ -1129,15 +1307,255 @@ class Aircraft(GeomBase):
         :rtype: parapy.geom.generic.positioning.Point
         """
         first_moment_of_mass = sum(tank.fuel.mass * np.array(tank.fuel.cog)
-                                   for _child in self.children
-                                   if hasattr(_child, 'fuel_tanks')
-                                   for tank in _child.fuel_tanks
+                                   for tank in self.fuel_tanks
                                    if not tank.is_empty)
         if self.fuel_mass <= 0.:
             return ORIGIN
         else:
             return Point(*first_moment_of_mass / self.fuel_mass)
 
+    @Attribute
+    def fuel_feed(self):
+        """ The engines fed by the fuel tanks of each wing, keyed by the name
+        of the wing. The tanks of a wing with engines feed those engines.
+        The vertical tail tanks feed the engines of both main wings; the
+        other tanks without engines feed the engines of the starboard main
+        wing.
+
+        :rtype: dict[str, list[classes.engines.engine.Engine]]
+        """
+        feed = {}
+        for wing_name, _ in TANK_WINGS:
+            wing = getattr(self, wing_name)
+            if wing.engines is not Undefined:
+                engines = list(wing.engines)
+            elif wing_name == 'vertical_tail':
+                engines = list(self.main_wing_starboard.engines) + \
+                    list(self.main_wing_port.engines)
+            else:
+                engines = list(self.main_wing_starboard.engines)
+            feed[wing_name] = engines
+        return feed
+
+    @Attribute
+    def fuel_flows(self):
+        """ The fuel flow drawn from a tank of each wing when it is used, in
+        kg/s, keyed by the name of the wing: the total fuel consumption of
+        the engines it feeds (see :any:`fuel_feed`) at the
+        :any:`thrust_setting`. It is computed once and passed down to the
+        fuel of every tank.
+
+        :rtype: dict[str, float]
+        """
+        return dict((wing_name, self.thrust_setting * sum(
+            engine.thrust * engine.specific_fuel_consumption
+            for engine in engines))
+            for wing_name, engines in self.fuel_feed.items())
+
+    @Attribute
+    def fuel_tanks(self):
+        """ All fuel tanks of this aircraft, in the fixed order of the
+        :any:`fuel_model`.
+
+        :rtype: list[classes.wing_primitives.fuel.fuel_tank.FuelTank]
+        """
+        return [tank for wing_name, _ in TANK_WINGS
+                for tank in getattr(self, wing_name).fuel_tanks]
+
+    @Attribute
+    def pitch_level_tables(self):
+        """ The level tables of all fuel tanks, parameterised by the pitch
+        angle as well as the volume, such that the :any:`fuel_model` gives
+        the centre of gravity at the attitude of the aircraft (its trimmed
+        angle of attack, see :any:`get_alpha`), instead of with horizontal
+        free surfaces. They are sampled once at the :any:`fuel_pitches`, or
+        None if these are not given.
+
+        :rtype: list[classes.wing_primitives.fuel.fuel_level_table.
+            PitchLevelTable] | None
+        """
+        if not self.fuel_pitches:
+            return None
+        return [tank.pitch_level_table(self.fuel_pitches)
+                for tank in self.fuel_tanks]
+
+    @Attribute
+    def fuel_model(self):
+        """ The lightweight, array-backed model of the fuel system. It does
+        not depend on the fuel masses, such that it is shared by all fuel
+        states (see :any:`fuel_state`).
+
+        :rtype: classes.analysis.fuel_model.FuelModel
+        """
+        return FuelModel.from_aircraft(self)
+
+    def fuel_state(self):
+        """ Return the current fuel masses of all tanks as a
+        :class:`~classes.analysis.fuel_model.FuelState`, which can be
+        advanced and copied without touching the ParaPy tree.
+
+        :rtype: classes.analysis.fuel_model.FuelState
+        """
+        return self.fuel_model.state([tank.fuel.mass
+                                      for tank in self.fuel_tanks])
+
+    def evaluate_burn(self, group, time_step, state=None):
+        """ Return the trimmed aerodynamic state after a hypothetical burn
+        from a group of tanks, without changing this aircraft.
+
+        :param group: the name of the group of tanks, e.g. 'main_0'.
+        :type group: str
+
+        :param time_step: the time step in s.
+        :type time_step: float
+
+        :param state: the fuel state before the burn. Defaults to the
+            current :any:`fuel_state`.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :return: see :meth:`~classes.analysis.burn_evaluation.BurnEvaluator.
+            evaluate`.
+        :rtype: dict
+        """
+        state = self.fuel_state() if state is None else state
+        return self.burn_evaluator.evaluate(state, group, time_step)
+
+    def fuel_fidelity_report(self, states=None, reference='exact'):
+        """ Compare the centre of gravity of the aircraft between the
+        fidelity levels of the fuel model (see :any:`fuel_fidelity`), for a
+        number of fuel states. The fuel model of every level is a copy of
+        the :any:`fuel_model` with the level tables of that level, such that
+        the comparison does not change the aircraft. The warm-start values
+        of the solvers (see :meth:`warm_start_values`) are restored
+        afterwards.
+
+        :param states: the fuel states. Defaults to the current
+            :any:`fuel_state`.
+        :type states: list[classes.analysis.fuel_model.FuelState]
+
+        :param reference: the level with which the others are compared.
+        :type reference: str
+
+        :return: per level, the (n, 3) centres of gravity and the maximum
+            distance to those of the reference level.
+        :rtype: dict[str, dict]
+        """
+        states = [self.fuel_state()] if states is None else states
+        masses = np.array([state.masses for state in states])
+        cogs = {}
+        warm_start = self.warm_start_values()
+        try:
+            for fidelity in FUEL_FIDELITIES:
+                model = copy.copy(self.fuel_model)
+                model.level_tables = [tank.level_table(fidelity)
+                                      for tank in self.fuel_tanks]
+                cogs[fidelity] = model.cog(masses)
+        finally:
+            self.set_warm_start_values(warm_start)
+        return dict((fidelity, {
+            'cog': cog, 'discrepancy': float(np.max(np.linalg.norm(
+                cog - cogs[reference], axis=-1)))})
+            for fidelity, cog in cogs.items())
+
+    def schedule_fuel_usage(self, time_step, beam_width=10, end_time=np.inf,
+                            linear=True, method='beam',
+                            mission_profile=None):
+        """ Return a schedule of burns over the whole mission, from the
+        current :any:`fuel_state`. The aircraft itself is not changed. If a
+        :any:`mission_profile` is given, every segment is flown with its own
+        CL and fuel flows, and the mission ends at the end of the profile.
+
+        * 'beam': the schedule that minimises the time integral of the
+          induced drag, found with a
+          :class:`~classes.analysis.tank_scheduler.TankScheduler`.
+        * 'event': the greedy choice of tanks with variable time steps up to
+          the next decision point, found with an
+          :class:`~classes.analysis.tank_scheduler.EventDrivenScheduler`.
+
+        :param time_step: the (maximum) duration of a burn in s.
+        :type time_step: float
+
+        :param beam_width: the number of partial schedules kept at every
+            step of the 'beam' method.
+        :type beam_width: int
+
+        :param end_time: the duration of the mission in s. By default, the
+            mission ends when all tanks are empty.
+        :type end_time: float
+
+        :param linear: trim with the :any:`linear_trim_model` (fast) instead
+            of the :any:`trim_solver`, if the :any:`aero_database` provides
+            it (see :any:`has_linear_trim_model`).
+        :type linear: bool
+
+        :param method: 'beam' or 'event'.
+        :type method: str
+
+        :param mission_profile: the mission profile. Defaults to the
+            :any:`mission_profile` of this aircraft.
+        :type mission_profile: classes.analysis.mission_profile.MissionProfile
+
+        :raises NameError: if the method is not recognised.
+
+        :rtype: classes.analysis.tank_scheduler.Schedule
+        """
+        evaluator = BurnEvaluator(self.aero_database,
+                                  self.linear_trim_model
+                                  if linear and self.has_linear_trim_model
+                                  else self.trim_solver)
+        if method == 'beam':
+            scheduler = TankScheduler(evaluator, time_step, beam_width)
+        elif method == 'event':
+            scheduler = EventDrivenScheduler(evaluator, max_step=time_step)
+        else:
+            msg = '{} is not recognised as a valid scheduling method.'
+            raise NameError(msg.format(method))
+        if mission_profile is None:
+            mission_profile = self.mission_profile
+        if mission_profile is not None:
+            return mission_profile.schedule(
+                scheduler, self.fuel_state(), self.air_density, self.velocity,
+                end_time)
+        return scheduler.schedule(self.fuel_state(), end_time)
+
+    def warm_start_values(self):
+        """ Return the values from which the solvers continue: the previous
+        elevator deflection of the :any:`trim_solver`, and the previous
+        free-surface heights of the fuel tanks (see
+        :attr:`~classes.wing_primitives.fuel.free_surface.FreeSurfaceSolver.
+        warm_start`). Together with the :any:`fuel_state`, these are enough
+        to resume a simulation.
+
+        :rtype: dict
+        """
+        return {'delta_e': self.trim_solver.last_delta_e,
+                'free_surface': [tank.free_surface_solver.warm_start
+                                 for tank in self.fuel_tanks]}
+
+    def set_warm_start_values(self, values):
+        """ Restore the values of :meth:`warm_start_values`.
+
+        :param values: the warm-start values.
+        :type values: dict
+
+        :rtype: None
+        """
+        self.trim_solver.last_delta_e = values['delta_e']
+        for tank, warm_start in zip(self.fuel_tanks, values['free_surface']):
+            tank.free_surface_solver.warm_start = warm_start
+
+    def set_fuel_state(self, state):
+        """ Set the fuel masses of all tanks to those of a fuel state.
+
+        :param state: the fuel state.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :rtype: None
+        """
+        for tank, mass in zip(self.fuel_tanks, state.masses):
+            if tank.fuel.mass != mass:
+                tank.fuel.mass = float(mass)
+
     @Attribute
     def forward_cg(self):
         """ The most forward position of the center of gravity, expressed as a
@@ -1165,31 +1583,103 @@ class Aircraft(GeomBase):
         the aerodynamic moments balance the aircraft weight-induced moments.
         Returns the required elevator deflection for trim conditions.
 
+        The deflection is found by the :any:`trim_solver`, which inverts the
+        (piecewise linear) Cm(delta_e) relation of the AVL grid directly,
+        starting from the previous trim solution.
+
+        :param max_iter: the maximum number of iterations of the fallback
+            root finder.
+        :type max_iter: int
+
         :rtype: float
         """
         # Take all the moments around the nose of the aircraft.
         arm = self.cog - self.position
         weight_cm = self.CL * arm.x / self.mean_aerodynamic_chord
 
-        convergence_error = np.inf
-        interval = [self.avl_delta_e_start, self.avl_delta_e_end]
-        n_iter = 0
-
-        while convergence_error > self.convergence_tol and n_iter <= max_iter:
-            # Set the elevator deflection to the midpoint of the interval
-            delta_e = sum(interval) / len(interval)
-            aero_cm = self.get_Cm(self.CL, delta_e)
-            if weight_cm + aero_cm > 0:
-                # If the weight moment outweighs the aerodynamic moment
-                interval = [delta_e, interval[-1]]
-            else:
-                interval = [interval[0], delta_e]
+        return self.trim_solver.solve(self.CL, weight_cm, max_iter=max_iter)
 
-            convergence_error = abs(weight_cm + aero_cm)
+    def weight_cm(self, CL=None, cog=None):
+        """ Return the weight-induced pitching moment coefficient around the
+        nose of the aircraft.
 
-            n_iter += 1
+        :param CL: (an array of) lift coefficient(s). Defaults to :any:`CL`.
+        :type CL: float | numpy.ndarray
 
-        return delta_e
+        :param cog: the centre of gravity, or (an array of) its
+            x-coordinate(s). Defaults to :any:`cog`.
+        :type cog: parapy.geom.Point | float | numpy.ndarray
+
+        :rtype: float | numpy.ndarray
+        """
+        CL = self.CL if CL is None else np.asarray(CL, dtype=float)
+        cog = self.cog if cog is None else cog
+        cog_x = cog.x if isinstance(cog, Point) else np.asarray(cog,
+                                                                dtype=float)
+        return CL * (cog_x - self.position.x) / self.mean_aerodynamic_chord
+
+    def trim_linear(self, CL=None, cog=None):
+        """ Return the elevator deflection(s) for trim according to the
+        :any:`linear_trim_model`. Whole arrays of lift coefficients and
+        centre of gravity positions can be evaluated at once, e.g. to screen
+        many fuel states before confirming them with :any:`trim`. Without a
+        linear trim model (see :any:`has_linear_trim_model`), every state is
+        trimmed with the :any:`trim_solver`.
+
+        :param CL: (an array of) lift coefficient(s). Defaults to :any:`CL`.
+        :type CL: float | numpy.ndarray
+
+        :param cog: the centre of gravity, or (an array of) its
+            x-coordinate(s). Defaults to :any:`cog`.
+        :type cog: parapy.geom.Point | float | numpy.ndarray
+
+        :rtype: float | numpy.ndarray
+        """
+        CL = self.CL if CL is None else CL
+        if not self.has_linear_trim_model:
+            return np.vectorize(self.trim_solver.solve)(
+                CL, self.weight_cm(CL, cog))
+        return self.linear_trim_model.solve(CL, self.weight_cm(CL, cog))
+
+    def validate_trim_linear(self, CLs, cogs):
+        """ Return the differences between the elevator deflections of
+        :any:`trim_linear` and those of the full (interpolating) trim.
+
+        :param CLs: the lift coefficients.
+        :type CLs: collections.Sequence[float] | numpy.ndarray
+
+        :param cogs: the x-coordinates of the centre of gravity.
+        :type cogs: collections.Sequence[float] | numpy.ndarray
+
+        :rtype: numpy.ndarray
+        """
+        return self.linear_trim_model.validate(
+            CLs, self.weight_cm(CLs, cogs), tolerance=self.convergence_tol)
+
+    def free_surface_stats(self):
+        """ Return the iteration statistics of the free-surface solvers that
+        are used by the fuel tanks, summed over the tanks: the solver of the
+        exact free surface (see :attr:`~classes.wing_primitives.fuel.
+        fuel_tank.FuelTank.free_surface_solver`) and, if the level table of a
+        tank solves for the height itself (a
+        :class:`~classes.wing_primitives.fuel.tank_mesh.TankMesh`), that of
+        its level table. An evaluation is one volume computation below a
+        height.
+
+        :rtype: dict
+        """
+        solvers = []
+        for tank in self.fuel_tanks:
+            for solver in (tank.free_surface_solver,
+                           getattr(tank.fuel_level_table, 'solver', None)):
+                if solver is not None and \
+                        not any(solver is other for other in solvers):
+                    solvers.append(solver)
+        calls = sum(solver.n_calls for solver in solvers)
+        evaluations = sum(solver.n_evaluations for solver in solvers)
+        return {'calls': calls, 'evaluations': evaluations,
+                'mean_evaluations': (float(evaluations) / calls
+                                     if calls else 0.)}
 
     def get_alpha(self, CL, delta_e):
         """ Return the drag coefficient for a given alpha (angle
@@ -1241,7 +1731,8 @@ class Aircraft(GeomBase):
 
     def get_quantity(self, quantity, CL, delta_e):
         """ Return any AVL 'total' quantity for a given alpha (angle
-        of attack) and delta_e (elevator deflection).
+        of attack) and delta_e (elevator deflection). The interpolants are
+        cached in the :any:`aero_database`.
 
         :param quantity: the quantity that is requested
         :type quantity: str
@@ -1256,34 +1747,91 @@ class Aircraft(GeomBase):
 
         :rtype: numpy.ndarray[float]
         """
-        if not self.avl_CL_start <= CL <= self.avl_CL_end:
-            raise Exception(
-                'The requested {} for alpha: {} is out of the range of '
-                'alpha_start: {} and alpha_end: {}. '
-                'Extrapolation is not supported.'
-                .format(quantity, CL, self.avl_CL_start, self.avl_CL_end)
-            )
-        if not self.avl_delta_e_start <= delta_e <= self.avl_delta_e_end:
-            raise Exception(
-                'The requested {} for alpha: {} is out of the range of '
-                'alpha_start: {} and alpha_end: {}. '
-                'Extrapolation is not supported.'
-                .format(quantity, delta_e,
-                        self.avl_delta_e_start, self.avl_delta_e_end)
-            )
+        return self.aero_database.get_quantity(quantity, CL, delta_e)
+
+    def get_quantities(self, CLs, delta_es,
+                       quantities=('CDtot', 'Cmtot', 'Alpha')):
+        """ Return several AVL 'total' quantities for (arrays of) lift
+        coefficients and elevator deflections in a single vectorised call.
+
+        :param CLs: lift coefficient(s)
+        :type CLs: float | numpy.ndarray
 
-        CLs = np.arange(self.avl_CL_start, self.avl_CL_end, self.avl_CL_step)
+        :param delta_es: elevator deflection(s) in degrees
+        :type delta_es: float | numpy.ndarray
 
-        delta_es = np.arange(self.avl_delta_e_start, self.avl_delta_e_end,
-                             self.avl_delta_e_step)
-        values = [[self.avl_analysis.results['CL_{:.1f}_delta_e_{:.1f}'
-                   .format(float(_CL), float(_delta_e))]['Totals'][quantity]
-                   for _CL in CLs]
-                  for _delta_e in delta_es]
+        :param quantities: the quantities that are requested
+        :type quantities: collections.Sequence[str]
+
+        :raises Exception: if any CL or delta_e is out of the range of
+            analysed values.
+
+        :return: one array per requested quantity, in the order of
+            ``quantities``.
+        :rtype: tuple[numpy.ndarray]
+        """
+        return self.aero_database.get_quantities(CLs, delta_es, quantities)
 
-        f = interpolate.interp2d(CLs, delta_es, values, bounds_error=True)
+    def run_avl(self):
+        """ Run AVL for all :any:`cases`. If :any:`avl_n_processes` is larger
+        than one, the cases are partitioned over a pool of independent AVL
+        runs, whose results are merged.
 
-        return f(CL, delta_e)
+        :rtype: dict
+        """
+        if self.avl_n_processes > 1:
+            return run_parallel(self.avl_configuration, self.cases,
+                                self.avl_n_processes)
+        return self.avl_analysis.results
+
+    def avl_case(self, CL, delta_e, decimals=1):
+        """ Return the AVL run case for a lift coefficient and an elevator
+        deflection.
+
+        :param CL: lift coefficient
+        :type CL: float
+
+        :param delta_e: elevator deflection in degrees
+        :type delta_e: float
+
+        :param decimals: the number of decimals in the name of the case.
+        :type decimals: int
+
+        :rtype: kbeutils.avl.Case
+        """
+        return avl.Case(name=case_name(CL, delta_e, decimals),
+                        settings={'alpha': avl.Parameter(name='alpha',
+                                                         value=CL,
+                                                         constraint='CL'),
+                                  'elevator': delta_e})
+
+    def run_avl_points(self, points):
+        """ Return the AVL 'Totals' at a list of (CL, delta_e) points. The
+        results are taken from the :any:`avl_cache` if available, and the
+        cases are run in parallel if :any:`avl_n_processes` is larger than
+        one.
+
+        :param points: the (CL, delta_e) points.
+        :type points: list[tuple[float]]
+
+        :return: the AVL 'Totals', keyed by the points.
+        :rtype: dict[tuple[float], dict]
+        """
+        cases = [self.avl_case(CL, delta_e, decimals=6)
+                 for CL, delta_e in points]
+
+        def run():
+            return run_parallel(self.avl_configuration, cases,
+                                self.avl_n_processes)
+
+        if self.avl_cache is None:
+            results = run()
+        else:
+            results = self.avl_cache.get_or_run(
+                self.avl_configuration, cases, run,
+                refresh=self.avl_cache_refresh)
+        return {point: results[case.name]['Totals']
+                for point, case in zip(points, cases)}
 
     def get_custom_avl_results(self, alpha, show_trefftz_plot=False,
                                show_geometry=False, **kwargs):
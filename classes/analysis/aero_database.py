@@ -0,0 +1,435 @@
+import numpy as np
+from scipy.interpolate import LinearNDInterpolator, RegularGridInterpolator
+
+#: The stability and control derivatives that are captured per case, mapped
+#: to their names in the 'StabilityDerivatives' of the AVL results. The
+#: control derivatives are formatted with the AVL index of the elevator (see
+#: :func:`control_index`). All derivatives are stored per degree.
+DERIVATIVES = {'CL_alpha': 'CLa', 'Cm_alpha': 'Cma',
+               'CL_delta_e': 'CLd{}', 'Cm_delta_e': 'Cmd{}'}
+
+
+def control_index(configuration, name='elevator'):
+    """ Return the index i of a control in AVL, as in its derivatives
+    'CLd<i>'. AVL numbers the controls in the order in which their names
+    first appear in the sections of the surfaces of the configuration.
+
+    :param configuration: the AVL configuration.
+    :type configuration: kbeutils.avl.Configuration
+
+    :param name: the name of the control.
+    :type name: str
+
+    :raises Exception: if the configuration has no control of that name.
+
+    :rtype: int
+    """
+    names = []
+    for surface in configuration.surfaces:
+        for section in surface.sections:
+            for control in section.controls:
+                if control.name not in names:
+                    names.append(control.name)
+    if name not in names:
+        msg = 'The AVL configuration has no control {!r}, only {}.'
+        raise Exception(msg.format(name, names))
+    return names.index(name) + 1
+
+
+def case_name(CL, delta_e, decimals=1):
+    """ Return the name of the AVL run case for a given lift coefficient
+    and elevator deflection, as it is used as a key in the AVL results.
+
+    :param CL: lift coefficient
+    :type CL: float | int
+
+    :param delta_e: elevator deflection in degrees
+    :type delta_e: float | int
+
+    :param decimals: the number of decimals in the name.
+    :type decimals: int
+
+    :rtype: str
+    """
+    return 'CL_{0:.{2}f}_delta_e_{1:.{2}f}'.format(float(CL), float(delta_e),
+                                                   decimals)
+
+
+class AeroDatabase(object):
+    """ A database of the aerodynamic 'Totals' that were obtained from AVL
+    on a regular grid of lift coefficients and elevator deflections.
+
+    The value grids and the interpolants are built lazily, only once per
+    quantity, and are kept for the lifetime of this object. Because the
+    :class:`~classes.aircraft.Aircraft` creates this object in a ParaPy
+    attribute, a new database (with an empty cache) is only created when
+    the AVL results, and thus the aerodynamic configuration, change.
+
+    :param results: the AVL results, keyed by :func:`case_name`.
+    :type results: dict
+
+    :param CLs: the (sorted) lift coefficients of the AVL grid.
+    :type CLs: collections.Sequence[float] | numpy.ndarray
+
+    :param delta_es: the (sorted) elevator deflections of the AVL grid.
+    :type delta_es: collections.Sequence[float] | numpy.ndarray
+
+    :param elevator_index: the AVL index of the elevator (see
+        :func:`control_index`). If None, the control derivatives are always
+        obtained by finite differences.
+    :type elevator_index: int
+    """
+
+    is_regular_grid = True
+
+    def __init__(self, results, CLs, delta_es, elevator_index=None):
+        self.results = results
+        self.CLs = np.array(CLs, dtype=float)
+        self.delta_es = np.array(delta_es, dtype=float)
+        self.elevator_index = elevator_index
+
+        self.hits = 0
+        self.misses = 0
+        self.frozen = False
+        self._interpolants = {}
+
+    def freeze(self, quantities=('CDtot', 'Cmtot', 'Alpha')):
+        """ Build the interpolants of the given quantities and freeze this
+        database: its grids become read-only and its cache can no longer be
+        cleared, such that it can be safely shared by all fuel states of a
+        single aerodynamic configuration.
+
+        :param quantities: the quantities of which the interpolants are built.
+        :type quantities: collections.Sequence[str]
+
+        :rtype: AeroDatabase
+        """
+        for quantity in quantities:
+            self.interpolant(quantity)
+        for array in (self.CLs, self.delta_es):
+            array.flags.writeable = False
+        self.frozen = True
+        return self
+
+    @property
+    def cache_info(self):
+        """ The interpolant cache statistics of this database.
+
+        :rtype: dict
+        """
+        return {'hits': self.hits, 'misses': self.misses,
+                'size': len(self._interpolants)}
+
+    def values(self, quantity):
+        """ Return the grid of AVL values for a certain quantity. The first
+        axis of the grid corresponds to :attr:`CLs`, the second to
+        :attr:`delta_es`.
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :rtype: numpy.ndarray
+        """
+        if quantity in DERIVATIVES:
+            return self.derivative_values(quantity)
+        return np.array([[self.results[case_name(CL, delta_e)]
+                          ['Totals'][quantity]
+                          for delta_e in self.delta_es]
+                         for CL in self.CLs])
+
+    def derivative_values(self, name):
+        """ Return the grid of a stability or control derivative (see
+        :data:`DERIVATIVES`) per degree. The derivatives computed by AVL are
+        used if the results contain them (and, for the control derivatives,
+        the :attr:`elevator_index` is known), otherwise they are obtained by
+        finite differences on the grid (see
+        :meth:`finite_difference_derivatives`).
+
+        :param name: the name of the derivative, e.g. 'Cm_delta_e'.
+        :type name: str
+
+        :rtype: numpy.ndarray
+        """
+        if self.elevator_index is None and name.endswith('delta_e'):
+            return self.finite_difference_derivatives()[name]
+        key = DERIVATIVES[name].format(self.elevator_index)
+        try:
+            values = np.array([[self.results[case_name(CL, delta_e)]
+                                ['StabilityDerivatives'][key]
+                                for delta_e in self.delta_es]
+                               for CL in self.CLs])
+        except KeyError:
+            return self.finite_difference_derivatives()[name]
+        # AVL gives the alpha derivatives per radian and the control
+        # derivatives per degree.
+        return np.radians(values) if name.endswith('alpha') else values
+
+    def finite_difference_derivatives(self):
+        """ Return the grids of the stability and control derivatives per
+        degree, derived from the Alpha and Cmtot grids. As the cases are run
+        at a constant CL, the derivatives follow from::
+
+            dalpha/dCL = 1 / CL_alpha
+            dalpha/ddelta_e = -CL_delta_e / CL_alpha
+            dCm/dCL = Cm_alpha / CL_alpha
+            dCm/ddelta_e = Cm_delta_e - Cm_alpha * CL_delta_e / CL_alpha
+
+        :rtype: dict[str, numpy.ndarray]
+        """
+        dalpha_dCL, dalpha_ddelta_e = np.gradient(self.values('Alpha'),
+                                                  self.CLs, self.delta_es)
+        dCm_dCL, dCm_ddelta_e = np.gradient(self.values('Cmtot'),
+                                            self.CLs, self.delta_es)
+        CL_alpha = 1. / dalpha_dCL
+        CL_delta_e = -CL_alpha * dalpha_ddelta_e
+        Cm_alpha = CL_alpha * dCm_dCL
+        Cm_delta_e = dCm_ddelta_e + Cm_alpha * CL_delta_e / CL_alpha
+        return {'CL_alpha': CL_alpha, 'Cm_alpha': Cm_alpha,
+                'CL_delta_e': CL_delta_e, 'Cm_delta_e': Cm_delta_e}
+
+    def interpolant(self, quantity):
+        """ Return the (cached) interpolant of a certain quantity.
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :rtype: scipy.interpolate.RegularGridInterpolator
+        """
+        try:
+            f = self._interpolants[quantity]
+        except KeyError:
+            self.misses += 1
+            f = RegularGridInterpolator((self.CLs, self.delta_es),
+                                        self.values(quantity),
+                                        bounds_error=True)
+            self._interpolants[quantity] = f
+        else:
+            self.hits += 1
+        return f
+
+    def check_bounds(self, quantity, CL, delta_e):
+        """ Check that (all) CL and delta_e lie within the range of the grid.
+
+        :raises Exception: if CL or delta_e is out of the range of the grid.
+        """
+        CL = np.asarray(CL)
+        delta_e = np.asarray(delta_e)
+        if not np.all((self.CLs[0] <= CL) & (CL <= self.CLs[-1])):
+            raise Exception(
+                'The requested {} for CL: {} is out of the range of '
+                'CL_start: {} and CL_end: {}. '
+                'Extrapolation is not supported.'
+                .format(quantity, CL, self.CLs[0], self.CLs[-1])
+            )
+        if not np.all((self.delta_es[0] <= delta_e) &
+                      (delta_e <= self.delta_es[-1])):
+            raise Exception(
+                'The requested {} for delta_e: {} is out of the range of '
+                'delta_e_start: {} and delta_e_end: {}. '
+                'Extrapolation is not supported.'
+                .format(quantity, delta_e, self.delta_es[0],
+                        self.delta_es[-1])
+            )
+
+    def clear(self):
+        """ Drop all cached interpolants and reset the cache statistics.
+
+        :raises Exception: if this database is frozen.
+
+        :rtype: None
+        """
+        if self.frozen:
+            raise Exception('A frozen aero database cannot be cleared.')
+        self._interpolants = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_quantity(self, quantity, CL, delta_e):
+        """ Return any AVL 'total' quantity for a given CL (lift
+        coefficient) and delta_e (elevator deflection).
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :param CL: lift coefficient
+        :type CL: float | int
+
+        :param delta_e: elevator deflection in degrees
+        :type delta_e: float | int
+
+        :raises Exception: if CL or delta_e is out of the range of the grid.
+
+        :rtype: numpy.ndarray[float]
+        """
+        self.check_bounds(quantity, CL, delta_e)
+        return self.interpolant(quantity)([[CL, delta_e]])
+
+    def get_quantities(self, CLs, delta_es,
+                       quantities=('CDtot', 'Cmtot', 'Alpha')):
+        """ Return several AVL 'total' quantities for (arrays of) CLs and
+        delta_es in one vectorised pass. The CLs and delta_es are broadcast
+        against each other, the range check is done only once, and the
+        interpolation points are shared between all quantities.
+
+        :param CLs: lift coefficient(s)
+        :type CLs: float | numpy.ndarray
+
+        :param delta_es: elevator deflection(s) in degrees
+        :type delta_es: float | numpy.ndarray
+
+        :param quantities: the quantities that are requested
+        :type quantities: collections.Sequence[str]
+
+        :raises Exception: if any CL or delta_e is out of the range of the
+            grid.
+
+        :return: one array per requested quantity, in the order of
+            ``quantities``, with the broadcast shape of CLs and delta_es.
+        :rtype: tuple[numpy.ndarray]
+        """
+        CLs, delta_es = np.broadcast_arrays(np.asarray(CLs, dtype=float),
+                                            np.asarray(delta_es, dtype=float))
+        self.check_bounds(', '.join(quantities), CLs, delta_es)
+
+        points = np.column_stack((CLs.ravel(), delta_es.ravel()))
+        return tuple(self.interpolant(quantity)(points).reshape(CLs.shape)
+                     for quantity in quantities)
+
+
+class ScatteredAeroDatabase(AeroDatabase):
+    """ A database of the aerodynamic 'Totals' that were obtained from AVL
+    at scattered (CL, delta_e) points, such as the points resulting from
+    :func:`refine_samples`. The quantities are interpolated linearly on a
+    Delaunay triangulation of the points.
+
+    :param samples: the AVL 'Totals', keyed by (CL, delta_e).
+    :type samples: dict[tuple[float], dict]
+    """
+
+    is_regular_grid = False
+
+    def __init__(self, samples):
+        self.points = np.array(sorted(samples))
+        super(ScatteredAeroDatabase, self).__init__(
+            samples, np.unique(self.points[:, 0]),
+            np.unique(self.points[:, 1]))
+
+    def freeze(self, quantities=('CDtot', 'Cmtot', 'Alpha')):
+        self.points.flags.writeable = False
+        return super(ScatteredAeroDatabase, self).freeze(quantities)
+
+    freeze.__doc__ = AeroDatabase.freeze.__doc__
+
+    def values(self, quantity):
+        """ Return the AVL values of a certain quantity at :attr:`points`.
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :raises Exception: if a stability or control derivative is requested,
+            as these are not captured on scattered points.
+
+        :rtype: numpy.ndarray
+        """
+        if quantity in DERIVATIVES:
+            raise Exception('The stability and control derivatives are only '
+                            'available on a regular grid.')
+        return np.array([self.results[tuple(point)][quantity]
+                         for point in self.points])
+
+    def interpolant(self, quantity):
+        """ Return the (cached) interpolant of a certain quantity.
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :rtype: scipy.interpolate.LinearNDInterpolator
+        """
+        try:
+            f = self._interpolants[quantity]
+        except KeyError:
+            self.misses += 1
+            f = LinearNDInterpolator(self.points, self.values(quantity))
+            self._interpolants[quantity] = f
+        else:
+            self.hits += 1
+        return f
+
+
+def refine_samples(run, CLs, delta_es, quantities=('Cmtot', 'CDtot'),
+                   tolerance=1e-3, max_level=3):
+    """ Sample the AVL 'Totals' adaptively. The grid spanned by CLs and
+    delta_es is sampled first. Then, for every cell, the value at its centre
+    is compared with the bilinear estimate from its corners. Cells for which
+    this error exceeds the tolerance for any of the quantities are split
+    into four, and the process is repeated for the new cells, up to
+    max_level times.
+
+    :param run: a function returning the AVL 'Totals' for a list of
+        (CL, delta_e) points, keyed by these points.
+    :type run: (list[tuple[float]]) -> dict[tuple[float], dict]
+
+    :param CLs: the lift coefficients of the initial (coarse) grid.
+    :type CLs: collections.Sequence[float]
+
+    :param delta_es: the elevator deflections of the initial (coarse) grid.
+    :type delta_es: collections.Sequence[float]
+
+    :param quantities: the quantities of which the error is estimated.
+    :type quantities: collections.Sequence[str]
+
+    :param tolerance: the maximum absolute interpolation error.
+    :type tolerance: float
+
+    :param max_level: the maximum number of refinement levels.
+    :type max_level: int
+
+    :return: the AVL 'Totals', keyed by (CL, delta_e).
+    :rtype: dict[tuple[float], dict]
+    """
+    def key(CL, delta_e):
+        return round(float(CL), 10), round(float(delta_e), 10)
+
+    samples = {}
+
+    def sample(points):
+        new_points = sorted({key(*point) for point in points} - set(samples))
+        if new_points:
+            samples.update(run(new_points))
+
+    sample([(CL, delta_e) for CL in CLs for delta_e in delta_es])
+    cells = [(CL0, CL1, delta_e0, delta_e1)
+             for CL0, CL1 in zip(CLs[:-1], CLs[1:])
+             for delta_e0, delta_e1 in zip(delta_es[:-1], delta_es[1:])]
+
+    # The new corners of the refined cells are sampled together with the
+    # centres of the next level, such that every level is one batch of runs.
+    new_corners = []
+    for _ in range(max_level):
+        sample(new_corners +
+               [key(0.5 * (CL0 + CL1), 0.5 * (delta_e0 + delta_e1))
+                for CL0, CL1, delta_e0, delta_e1 in cells])
+        new_corners = []
+
+        refined_cells = []
+        for CL0, CL1, delta_e0, delta_e1 in cells:
+            CLm, delta_em = 0.5 * (CL0 + CL1), 0.5 * (delta_e0 + delta_e1)
+            corners = [samples[key(CL, delta_e)] for CL in (CL0, CL1)
+                       for delta_e in (delta_e0, delta_e1)]
+            centre = samples[key(CLm, delta_em)]
+            error = max(abs(centre[quantity] -
+                            np.mean([corner[quantity] for corner in corners]))
+                        for quantity in quantities)
+            if error > tolerance:
+                new_corners += [key(CLm, delta_e0), key(CLm, delta_e1),
+                                key(CL0, delta_em), key(CL1, delta_em)]
+                refined_cells += [(CL0, CLm, delta_e0, delta_em),
+                                  (CL0, CLm, delta_em, delta_e1),
+                                  (CLm, CL1, delta_e0, delta_em),
+                                  (CLm, CL1, delta_em, delta_e1)]
+        if not refined_cells:
+            break
+        cells = refined_cells
+
+    sample(new_corners)
+    return samples
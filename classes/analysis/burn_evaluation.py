@@ -0,0 +1,241 @@
+import multiprocessing
+import pickle
+import warnings
+
+import numpy as np
+
+from classes.analysis.fuel_model import FuelState
+from classes.analysis.trim import TrimSolver
+
+# The evaluator and fuel model of a worker process of a
+# ParallelBurnEvaluator, set once by _initialise_worker.
+_worker = {}
+
+
+class BurnEvaluator(object):
+    """ Evaluates the trimmed aerodynamic state of an aircraft after a
+    hypothetical burn, without changing the aircraft. The burn is applied to
+    a copy of a :class:`~classes.analysis.fuel_model.FuelState`, after which
+    the aircraft is trimmed with a
+    :class:`~classes.analysis.trim.TrimSolver` on the aero database.
+
+    Every evaluation is independent of the others, such that candidate
+    tanks can be evaluated in any order (or in parallel), and no state needs
+    to be restored if an evaluation fails.
+
+    :param aero_database: the database providing 'Cmtot', 'CDtot' and
+        'Alpha'.
+    :type aero_database: classes.analysis.aero_database.AeroDatabase
+
+    :param trim_solver: the trim solver. By default, a new solver on the
+        aero database is used.
+    :type trim_solver: classes.analysis.trim.TrimSolver
+
+    :param pitch_iterations: the number of times the trim is repeated with
+        the centre of gravity at the pitch angle of the previous trim, for a
+        :attr:`~classes.analysis.fuel_model.FuelModel.pitch_aware` fuel
+        model. In level flight, the pitch angle equals the angle of attack.
+        The first trim takes the free surfaces horizontal.
+    :type pitch_iterations: int
+    """
+
+    def __init__(self, aero_database, trim_solver=None, pitch_iterations=1):
+        self.aero_database = aero_database
+        self.trim_solver = trim_solver if trim_solver is not None else \
+            TrimSolver(aero_database)
+        self.pitch_iterations = pitch_iterations
+
+    def evaluate_state(self, state):
+        """ Return the trimmed aerodynamic state for a fuel state.
+
+        :param state: the fuel state.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :return: CL, delta_e, CDi, alpha, Cm and the x-coordinate of the cog.
+        :rtype: dict[str, float]
+        """
+        values = self.evaluate_masses(state.masses[np.newaxis], state.model)
+        return dict((name, float(array[0])) for name, array in values.items())
+
+    def evaluate_masses(self, masses, model):
+        """ Return the trimmed aerodynamic states for a (k, n_tanks) array
+        of fuel masses of a fuel model, in one vectorised pass. The trim
+        solver is called per state, unless it accepts arrays, such as a
+        :class:`~classes.analysis.trim.LinearTrimModel`.
+
+        :param masses: the fuel masses of k states.
+        :type masses: numpy.ndarray
+
+        :param model: the fuel model of the states.
+        :type model: classes.analysis.fuel_model.FuelModel
+
+        :return: arrays of k values, keyed as in :meth:`evaluate_state`.
+        :rtype: dict[str, numpy.ndarray]
+        """
+        CLs = model.CL(masses)
+        pitches = None
+        n_trims = 1 + (self.pitch_iterations if model.pitch_aware else 0)
+        for _ in range(n_trims):
+            cogs = model.cog(masses, pitches)
+            weight_cms = CLs * (cogs[:, 0] - model.x_ref) / \
+                model.mean_aerodynamic_chord
+            if isinstance(self.trim_solver, TrimSolver):
+                delta_es = np.array([self.trim_solver.solve(CL, weight_cm)
+                                     for CL, weight_cm in zip(CLs,
+                                                              weight_cms)])
+            else:
+                delta_es = self.trim_solver.solve(CLs, weight_cms)
+            CDis, alphas, Cms = self.aero_database.get_quantities(
+                CLs, delta_es, ('CDtot', 'Alpha', 'Cmtot'))
+            pitches = alphas
+        return {'CL': CLs, 'delta_e': delta_es, 'CDi': CDis,
+                'alpha': alphas, 'Cm': Cms, 'cog': cogs[:, 0]}
+
+    def evaluate(self, state, group, time_step):
+        """ Return the trimmed aerodynamic state after burning fuel from a
+        group of tanks during a time step. The given state is not changed.
+
+        :param state: the fuel state before the burn.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :param group: the name of the group of tanks, e.g. 'main_0'.
+        :type group: str
+
+        :param time_step: the time step in s.
+        :type time_step: float
+
+        :return: the values of :meth:`evaluate_state`, together with the
+            group, the time during which fuel was burnt and the new state.
+        :rtype: dict
+        """
+        new_state, time = state.burnt(group, time_step)
+        result = self.evaluate_state(new_state)
+        result.update(group=group, time=time, state=new_state)
+        return result
+
+    def evaluate_all(self, state, groups, time_step):
+        """ Evaluate a burn from each of the groups (see :meth:`evaluate`).
+
+        :rtype: list[dict]
+        """
+        return [self.evaluate(state, group, time_step) for group in groups]
+
+    def best(self, state, time_step, groups=None, key='CDi'):
+        """ Return the evaluation of the burn that minimises a quantity.
+
+        :param state: the fuel state before the burn.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :param time_step: the time step in s.
+        :type time_step: float
+
+        :param groups: the candidate groups. Defaults to all groups of which
+            not all tanks are empty.
+        :type groups: collections.Sequence[str]
+
+        :param key: the quantity that is minimised.
+        :type key: str
+
+        :rtype: dict
+        """
+        groups = state.available_groups if groups is None else groups
+        return min(self.evaluate_all(state, groups, time_step),
+                   key=lambda result: result[key])
+
+
+def _initialise_worker(evaluator, model):
+    """ Store the evaluator and the fuel model in a worker process, where
+    they are kept (warm) for all evaluations.
+
+    :rtype: None
+    """
+    _worker['evaluator'] = evaluator
+    _worker['model'] = model
+
+
+def _evaluate_in_worker(args):
+    """ Evaluate a burn in a worker process. Only the fuel masses are sent
+    and returned, rather than the fuel states with their model.
+
+    :rtype: dict
+    """
+    masses, group, time_step = args
+    result = _worker['evaluator'].evaluate(
+        FuelState(_worker['model'], masses), group, time_step)
+    result['masses'] = result.pop('state').masses
+    return result
+
+
+class ParallelBurnEvaluator(BurnEvaluator):
+    """ A :class:`BurnEvaluator` that evaluates the burns from all candidate
+    groups concurrently, in a pool of worker processes. Every worker holds
+    its own copy of the evaluator and of the fuel model, which it receives
+    once, when the pool is started; per evaluation only
+    the fuel masses, the group and the time step are exchanged.
+
+    The pool should be closed after use, e.g. by using the evaluator as a
+    context manager. If the pool cannot be started, or the evaluations
+    cannot be distributed, they are done serially.
+
+    :param evaluator: the evaluator copied to the workers.
+    :type evaluator: BurnEvaluator
+
+    :param model: the fuel model of the evaluated states.
+    :type model: classes.analysis.fuel_model.FuelModel
+
+    :param n_processes: the number of worker processes.
+    :type n_processes: int
+    """
+
+    def __init__(self, evaluator, model, n_processes):
+        super(ParallelBurnEvaluator, self).__init__(
+            evaluator.aero_database, evaluator.trim_solver,
+            evaluator.pitch_iterations)
+        self.model = model
+        self.n_processes = n_processes
+        try:
+            self.pool = multiprocessing.Pool(n_processes, _initialise_worker,
+                                             (evaluator, model))
+        except (pickle.PicklingError, TypeError, OSError) as error:
+            warnings.warn('No worker processes could be started ({}); '
+                          'evaluating serially.'.format(error))
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """ Stop the worker processes.
+
+        :rtype: None
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def evaluate_all(self, state, groups, time_step):
+        """ Evaluate a burn from each of the groups, concurrently (see
+        :meth:`BurnEvaluator.evaluate`).
+
+        :rtype: list[dict]
+        """
+        serial = super(ParallelBurnEvaluator, self).evaluate_all
+        if self.pool is None or len(groups) <= 1:
+            return serial(state, groups, time_step)
+        try:
+            results = self.pool.map(_evaluate_in_worker,
+                                    [(state.masses, group, time_step)
+                                     for group in groups])
+        except (pickle.PicklingError, TypeError) as error:
+            warnings.warn('The evaluations could not be distributed over '
+                          'worker processes ({}); evaluating them '
+                          'serially.'.format(error))
+            self.close()
+            return serial(state, groups, time_step)
+        for result in results:
+            result['state'] = FuelState(state.model, result.pop('masses'))
+        return results
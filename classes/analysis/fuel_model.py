@@ -0,0 +1,286 @@
+import numpy as np
+
+#: The wings carrying fuel tanks, and the tank type of their tanks. The tanks
+#: of a type are burnt symmetrically, i.e. tank i of all wings of that type
+#: at once.
+TANK_WINGS = (('main_wing_starboard', 'main'), ('main_wing_port', 'main'),
+              ('horizontal_tail_starboard', 'trim'),
+              ('horizontal_tail_port', 'trim'), ('vertical_tail', 'vert'))
+
+
+class FuelModel(object):
+    """ A lightweight, array-backed model of the fuel system of an aircraft,
+    separate from the ParaPy tree. It holds everything that does not change
+    when fuel is burnt: the tanks in a fixed order, their capacities, fuel
+    flows and level tables, and the properties of the empty aircraft.
+    The fuel masses themselves are held by a :class:`FuelState`.
+
+    :param names: the names of the tanks, in a fixed order.
+    :type names: collections.Sequence[str]
+
+    :param groups: the indices of the tanks that are burnt together, keyed
+        by the name of the group, e.g. 'main_0'.
+    :type groups: dict[str, collections.Sequence[int]]
+
+    :param capacities: the maximum fuel mass of each tank in kg.
+    :type capacities: collections.Sequence[float]
+
+    :param fuel_flows: the fuel flow drawn from each tank when it is used,
+        in kg/s.
+    :type fuel_flows: collections.Sequence[float]
+
+    :param level_tables: the level table of each tank (see
+        :class:`~classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable`).
+        If all tables are :class:`~classes.wing_primitives.fuel.
+        fuel_level_table.PitchLevelTable`\ s, the centres of gravity can be
+        evaluated at a pitch angle.
+    :type level_tables: list
+
+    :param density: the fuel density in kg/m\ :sup:`3`\ .
+    :type density: float
+
+    :param ZFM: the zero fuel mass of the aircraft in kg.
+    :type ZFM: float
+
+    :param empty_cog: the (x, y, z) centre of gravity without fuel.
+    :type empty_cog: collections.Sequence[float]
+
+    :param lift_factor: the lift coefficient per kg of aircraft mass.
+    :type lift_factor: float
+
+    :param x_ref: the x-coordinate around which the weight-induced moment is
+        taken.
+    :type x_ref: float
+
+    :param mean_aerodynamic_chord: the reference chord of the moment
+        coefficient.
+    :type mean_aerodynamic_chord: float
+    """
+
+    def __init__(self, names, groups, capacities, fuel_flows, level_tables,
+                 density, ZFM, empty_cog, lift_factor, x_ref,
+                 mean_aerodynamic_chord):
+        self.names = list(names)
+        self.groups = dict((name, np.asarray(indices, dtype=int))
+                           for name, indices in groups.items())
+        self.capacities = np.asarray(capacities, dtype=float)
+        self.fuel_flows = np.asarray(fuel_flows, dtype=float)
+        self.level_tables = list(level_tables)
+        self.density = float(density)
+        self.ZFM = float(ZFM)
+        self.empty_cog = np.asarray(empty_cog, dtype=float)
+        self.lift_factor = float(lift_factor)
+        self.x_ref = float(x_ref)
+        self.mean_aerodynamic_chord = float(mean_aerodynamic_chord)
+
+    @classmethod
+    def from_aircraft(cls, aircraft):
+        """ Build the fuel model of an aircraft.
+
+        :type aircraft: classes.aircraft.Aircraft
+
+        :rtype: FuelModel
+        """
+        names, groups, tanks, fuel_flows = [], {}, [], []
+        for wing_name, tank_type in TANK_WINGS:
+            for i, tank in enumerate(getattr(aircraft, wing_name).fuel_tanks):
+                groups.setdefault('{}_{}'.format(tank_type, i),
+                                  []).append(len(tanks))
+                names.append('{}.fuel_tanks[{}]'.format(wing_name, i))
+                tanks.append(tank)
+                fuel_flows.append(aircraft.fuel_flows[wing_name])
+
+        return cls(names=names, groups=groups,
+                   capacities=[tank.fuel.initial_mass for tank in tanks],
+                   fuel_flows=fuel_flows,
+                   level_tables=aircraft.pitch_level_tables or
+                   [tank.fuel_level_table for tank in tanks],
+                   density=tanks[0].fuel.DENSITY if tanks else 1.,
+                   ZFM=aircraft.ZFM, empty_cog=aircraft.empty_cog,
+                   lift_factor=aircraft.g0 / (0.5 * aircraft.air_density *
+                                              aircraft.velocity ** 2 *
+                                              aircraft.wing_area),
+                   x_ref=aircraft.position.x,
+                   mean_aerodynamic_chord=aircraft.mean_aerodynamic_chord)
+
+    @property
+    def n_tanks(self):
+        """ :rtype: int """
+        return len(self.names)
+
+    def state(self, masses=None):
+        """ Return a fuel state of this model, full if no masses are given.
+
+        :rtype: FuelState
+        """
+        return FuelState(self, self.capacities if masses is None else masses)
+
+    @property
+    def pitch_aware(self):
+        """ Whether the centres of gravity depend on the pitch angle, i.e.
+        whether all level tables are sampled at a number of pitch angles.
+
+        :rtype: bool
+        """
+        return bool(self.level_tables) and all(
+            hasattr(table, 'pitches') for table in self.level_tables)
+
+    def tank_cogs(self, masses, pitch=None):
+        """ Return the (..., n_tanks, 3) centres of gravity of the fuel in
+        each tank, interpolated from the level tables. The masses may be a
+        (k, n_tanks) array of k fuel states.
+
+        :param pitch: the pitch angle(s) in degrees, one per state, at which
+            the free surfaces are taken if the model is :attr:`pitch_aware`.
+            By default, the free surfaces are horizontal.
+        :type pitch: float | numpy.ndarray
+
+        :rtype: numpy.ndarray
+        """
+        volumes = np.asarray(masses, dtype=float) / self.density
+        if pitch is None or not self.pitch_aware:
+            cogs = [table.cog(volume) for table, volume in
+                    zip(self.level_tables, np.moveaxis(volumes, -1, 0))]
+        else:
+            cogs = [table.cog(volume, pitch) for table, volume in
+                    zip(self.level_tables, np.moveaxis(volumes, -1, 0))]
+        return np.stack([np.reshape(cog, volumes.shape[:-1] + (3, ))
+                         for cog in cogs], axis=-2)
+
+    def mass(self, masses):
+        """ :rtype: float | numpy.ndarray """
+        return self.ZFM + np.sum(masses, axis=-1)
+
+    def cog(self, masses, pitch=None):
+        """ Return the (..., 3) centre(s) of gravity of the aircraft, at an
+        optional pitch angle (see :meth:`tank_cogs`).
+
+        :rtype: numpy.ndarray
+        """
+        masses = np.asarray(masses, dtype=float)
+        moment = self.ZFM * self.empty_cog + np.einsum(
+            '...i,...ij->...j', masses, self.tank_cogs(masses, pitch))
+        return moment / self.mass(masses)[..., np.newaxis]
+
+    def CL(self, masses):
+        """ Return the lift coefficient(s) for which lift equals weight.
+
+        :rtype: float | numpy.ndarray
+        """
+        return self.lift_factor * self.mass(masses)
+
+    def weight_cm(self, masses, pitch=None):
+        """ Return the weight-induced pitching moment coefficient(s), as used
+        for trimming (see :meth:`classes.aircraft.Aircraft.weight_cm`), at an
+        optional pitch angle (see :meth:`tank_cogs`).
+
+        :rtype: float | numpy.ndarray
+        """
+        return self.CL(masses) * (self.cog(masses, pitch)[..., 0] -
+                                  self.x_ref) / self.mean_aerodynamic_chord
+
+
+class FuelState(object):
+    """ The fuel masses of all tanks of a :class:`FuelModel`, held in a NumPy
+    array in the order of the model's tanks. A state can be advanced without
+    touching the ParaPy tree, and copied cheaply to evaluate alternatives.
+
+    :param model: the fuel model.
+    :type model: FuelModel
+
+    :param masses: the fuel mass in each tank in kg.
+    :type masses: collections.Sequence[float] | numpy.ndarray
+    """
+
+    def __init__(self, model, masses):
+        self.model = model
+        self.masses = np.array(masses, dtype=float)
+
+    def copy(self):
+        """ :rtype: FuelState """
+        return FuelState(self.model, self.masses)
+
+    @property
+    def fuel_mass(self):
+        """ :rtype: float """
+        return self.masses.sum()
+
+    @property
+    def mass(self):
+        """ :rtype: float """
+        return self.model.mass(self.masses)
+
+    @property
+    def cog(self):
+        """ :rtype: numpy.ndarray """
+        return self.model.cog(self.masses)
+
+    @property
+    def CL(self):
+        """ :rtype: float """
+        return self.model.CL(self.masses)
+
+    @property
+    def weight_cm(self):
+        """ :rtype: float """
+        return self.model.weight_cm(self.masses)
+
+    def is_empty(self, group):
+        """ Return whether all tanks of a group are empty.
+
+        :rtype: bool
+        """
+        return bool(np.all(self.masses[self.model.groups[group]] <= 0.))
+
+    @property
+    def available_groups(self):
+        """ The groups of which not all tanks are empty, sorted by name.
+
+        :rtype: list[str]
+        """
+        return [group for group in sorted(self.model.groups)
+                if not self.is_empty(group)]
+
+    def burn(self, group, time_step):
+        """ Burn fuel from the tanks of a group during a time step, in place.
+        As :meth:`classes.wing_primitives.fuel.fuel.Fuel.burn`, the time step
+        is shortened when a tank runs empty before its end.
+
+        :param group: the name of the group, e.g. 'main_0'.
+        :type group: str
+
+        :param time_step: the time step in s. A negative time step refuels.
+        :type time_step: float
+
+        :return: the time during which fuel was burnt.
+        :rtype: float
+        """
+        indices = self.model.groups[group]
+        if time_step > 0.:
+            time_step = min(time_step, self.time_to_empty(group))
+        self.masses[indices] = np.maximum(
+            self.masses[indices] - time_step * self.model.fuel_flows[indices],
+            0.)
+        return time_step
+
+    def time_to_empty(self, group):
+        """ Return the time after which the first tank of a group runs empty
+        when burning from it, or infinity if no fuel is drawn from it.
+
+        :rtype: float
+        """
+        indices = self.model.groups[group]
+        flows = self.model.fuel_flows[indices]
+        with np.errstate(divide='ignore'):
+            return float(np.min(np.where(flows > 0.,
+                                         self.masses[indices] / flows,
+                                         np.inf)))
+
+    def burnt(self, group, time_step):
+        """ Return a copy of this state after burning fuel from a group (see
+        :meth:`burn`), together with the time during which fuel was burnt.
+
+        :rtype: tuple[FuelState, float]
+        """
+        state = self.copy()
+        return state, state.burn(group, time_step)
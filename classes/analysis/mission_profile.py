@@ -0,0 +1,244 @@
+import copy
+import math
+
+import numpy as np
+
+from classes.analysis.fuel_model import FuelState
+from classes.analysis.tank_scheduler import Schedule
+
+#: The sea-level density (kg/m^3) and temperature (K), the lapse rate in the
+#: troposphere (K/m), the tropopause altitude (m) and the exponent of the
+#: density in the troposphere of the International Standard Atmosphere.
+ISA_RHO0 = 1.225
+ISA_T0 = 288.15
+ISA_LAPSE_RATE = 0.0065
+ISA_TROPOPAUSE = 11000.
+ISA_EXPONENT = 4.2559
+#: The scale height (m) of the density above the tropopause.
+ISA_SCALE_HEIGHT = 6341.6
+
+
+def isa_density(altitude):
+    """ Return the air density of the International Standard Atmosphere up
+    to 20 km.
+
+    :param altitude: the geopotential altitude in m.
+    :type altitude: float
+
+    :rtype: float
+    """
+    height = min(altitude, ISA_TROPOPAUSE)
+    density = ISA_RHO0 * (1. - ISA_LAPSE_RATE * height / ISA_T0) ** \
+        ISA_EXPONENT
+    if altitude > ISA_TROPOPAUSE:
+        density *= math.exp(-(altitude - ISA_TROPOPAUSE) / ISA_SCALE_HEIGHT)
+    return density
+
+
+def isa_altitude(density):
+    """ Return the altitude at which the International Standard Atmosphere
+    has a certain air density, the inverse of :func:`isa_density`.
+
+    :param density: the air density in kg/m\ :sup:`3`\ .
+    :type density: float
+
+    :rtype: float
+    """
+    tropopause_density = isa_density(ISA_TROPOPAUSE)
+    if density >= tropopause_density:
+        return ISA_T0 / ISA_LAPSE_RATE * (
+            1. - (density / ISA_RHO0) ** (1. / ISA_EXPONENT))
+    return ISA_TROPOPAUSE - ISA_SCALE_HEIGHT * math.log(
+        density / tropopause_density)
+
+
+class Segment(object):
+    """ A segment of a mission profile, flown at a constant (mean) altitude
+    and velocity.
+
+    :param name: the name of the segment, e.g. 'climb'.
+    :type name: str
+
+    :param duration: the duration of the segment in s.
+    :type duration: float
+
+    :param altitude: the (mean) altitude in m.
+    :type altitude: float
+
+    :param velocity: the true airspeed in m/s.
+    :type velocity: float
+
+    :param thrust_setting: the thrust as a fraction of the thrust of the
+        engines, by which their fuel flows are scaled.
+    :type thrust_setting: float
+
+    :param density: the air density in kg/m\ :sup:`3`\ . Defaults to the
+        density of the International Standard Atmosphere at the altitude.
+    :type density: float
+    """
+
+    def __init__(self, name, duration, altitude, velocity,
+                 thrust_setting=1., density=None):
+        self.name = name
+        self.duration = float(duration)
+        self.altitude = float(altitude)
+        self.velocity = float(velocity)
+        self.thrust_setting = float(thrust_setting)
+        self.density = isa_density(altitude) if density is None else \
+            float(density)
+
+    def dynamic_pressure(self):
+        """ :rtype: float """
+        return 0.5 * self.density * self.velocity ** 2
+
+
+class MissionProfile(object):
+    """ A mission as a sequence of :class:`Segment`\ s, e.g. climb, a number
+    of cruise steps and descent.
+
+    For every segment, the aero conditions are precomputed once as a copy of
+    the :class:`~classes.analysis.fuel_model.FuelModel` of the aircraft, with
+    the lift coefficient per kg of the segment's dynamic pressure and the
+    fuel flows of its thrust setting. A schedule of the mission is the
+    concatenation of the schedules of the segments, with the segment
+    boundaries as events, such that an event-driven scheduler (see
+    :class:`~classes.analysis.tank_scheduler.EventDrivenScheduler`) takes a
+    number of steps proportional to the number of events.
+
+    :param segments: the segments, in the order in which they are flown.
+    :type segments: collections.Sequence[Segment]
+    """
+
+    def __init__(self, segments):
+        self.segments = list(segments)
+
+    @classmethod
+    def standard(cls, cruise_altitude, cruise_velocity, cruise_time,
+                 n_cruise_steps=1, step_climb=600., climb_time=1200.,
+                 descent_time=1200., climb_thrust=1., cruise_thrust=0.8,
+                 descent_thrust=0.3):
+        """ Return a climb, a (step) cruise and a descent. The climb and the
+        descent are flown at the mean of the sea-level and cruise altitudes,
+        at 70% of the cruise velocity, and every cruise step is flown
+        ``step_climb`` higher than the previous one.
+
+        :param cruise_altitude: the altitude of the first cruise step in m.
+        :type cruise_altitude: float
+
+        :param cruise_velocity: the cruise velocity in m/s.
+        :type cruise_velocity: float
+
+        :param cruise_time: the total duration of the cruise in s.
+        :type cruise_time: float
+
+        :param n_cruise_steps: the number of cruise steps.
+        :type n_cruise_steps: int
+
+        :rtype: MissionProfile
+        """
+        mean_altitude = 0.5 * cruise_altitude
+        segments = [Segment('climb', climb_time, mean_altitude,
+                            0.7 * cruise_velocity, climb_thrust)]
+        for i in range(n_cruise_steps):
+            segments.append(Segment('cruise_{}'.format(i),
+                                    float(cruise_time) / n_cruise_steps,
+                                    cruise_altitude + i * step_climb,
+                                    cruise_velocity, cruise_thrust))
+        segments.append(Segment('descent', descent_time, mean_altitude,
+                                0.7 * cruise_velocity, descent_thrust))
+        return cls(segments)
+
+    @property
+    def duration(self):
+        """ :rtype: float """
+        return sum(segment.duration for segment in self.segments)
+
+    @property
+    def boundaries(self):
+        """ The start time of every segment and the end time of the
+        mission.
+
+        :rtype: numpy.ndarray
+        """
+        return np.cumsum([0.] + [segment.duration
+                                 for segment in self.segments])
+
+    def segment_at(self, time):
+        """ Return the index of the segment flown at a time.
+
+        :rtype: int
+        """
+        return int(np.clip(np.searchsorted(self.boundaries, time,
+                                           side='right') - 1,
+                           0, len(self.segments) - 1))
+
+    def models(self, model, air_density, velocity):
+        """ Return the fuel model of every segment: a copy of the fuel model
+        of the aircraft with the segment's lift coefficient per kg and fuel
+        flows.
+
+        :param model: the fuel model of the aircraft.
+        :type model: classes.analysis.fuel_model.FuelModel
+
+        :param air_density: the air density for which the lift factor of the
+            model is defined.
+        :type air_density: float
+
+        :param velocity: the velocity for which the lift factor of the model
+            is defined.
+        :type velocity: float
+
+        :rtype: list[classes.analysis.fuel_model.FuelModel]
+        """
+        reference = 0.5 * air_density * velocity ** 2
+        models = []
+        for segment in self.segments:
+            segment_model = copy.copy(model)
+            segment_model.lift_factor = model.lift_factor * reference / \
+                segment.dynamic_pressure()
+            segment_model.fuel_flows = model.fuel_flows * \
+                segment.thrust_setting
+            models.append(segment_model)
+        return models
+
+    def schedule(self, scheduler, state, air_density, velocity,
+                 end_time=np.inf):
+        """ Return the schedule of the whole mission, as the concatenation
+        of the schedules of the segments. Every step records the name of its
+        segment.
+
+        :param scheduler: a scheduler, such as an
+            :class:`~classes.analysis.tank_scheduler.EventDrivenScheduler`.
+
+        :param state: the fuel state at the start of the mission. It is not
+            changed.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :param air_density: see :meth:`models`.
+        :type air_density: float
+
+        :param velocity: see :meth:`models`.
+        :type velocity: float
+
+        :param end_time: an end time before the end of the mission, in s.
+        :type end_time: float
+
+        :rtype: classes.analysis.tank_scheduler.Schedule
+        """
+        steps, cost, final = [], 0., None
+        start_times = self.boundaries[:-1]
+        for segment, model, start in zip(
+                self.segments, self.models(state.model, air_density,
+                                           velocity), start_times):
+            if start >= end_time:
+                break
+            segment_schedule = scheduler.schedule(
+                FuelState(model, state.masses),
+                min(segment.duration, end_time - start))
+            for step in segment_schedule.steps:
+                step['segment'] = segment.name
+            steps.extend(segment_schedule.steps)
+            cost += segment_schedule.cost
+            final = segment_schedule.final
+            state = FuelState(state.model, segment_schedule.state.masses)
+        return Schedule(steps, final, cost, state)
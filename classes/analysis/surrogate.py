@@ -0,0 +1,282 @@
+import itertools
+
+import numpy as np
+
+#: The variables of the response surface, in the order of its input columns.
+VARIABLES = ('CL', 'delta_e', 'main_wing_long_pos', 'tail_scale')
+
+
+def monomials(max_powers, degree):
+    """ Return the exponents of all monomials up to and including a total
+    degree, in which each variable is raised to at most its maximum power.
+
+    :param max_powers: the maximum power of each variable.
+    :type max_powers: collections.Sequence[int]
+
+    :type degree: int
+
+    :rtype: numpy.ndarray
+    """
+    exponents = [powers for powers in
+                 itertools.product(*[range(min(max_power, degree) + 1)
+                                     for max_power in max_powers])
+                 if sum(powers) <= degree]
+    return np.array(sorted(exponents, key=lambda p: (sum(p), p[::-1])))
+
+
+class ResponseSurface(object):
+    """ A polynomial response surface, fitted by least squares to samples
+    of one or more quantities. The power of each variable is limited by the
+    number of distinct values at which it was sampled.
+
+    The inputs are scaled to [-1, 1] with the bounds of the training data.
+    Together with every prediction, an error bound is returned, based on the
+    residual standard deviation and the leverage of the prediction point::
+
+        bound = n_sigma * sigma * sqrt(1 + x^T (A^T A)^-1 x)
+
+    :param degree: the total degree of the polynomial.
+    :type degree: int
+
+    :param n_sigma: the number of standard deviations of the error bound.
+    :type n_sigma: float
+    """
+
+    def __init__(self, degree=3, n_sigma=2.):
+        self.degree = degree
+        self.n_sigma = n_sigma
+
+        self.lower = None
+        self.upper = None
+        self.exponents = None
+        self.coefficients = {}
+        self.sigma = {}
+        self.covariance = None
+
+    @property
+    def quantities(self):
+        """ :rtype: list[str] """
+        return sorted(self.coefficients)
+
+    def scale(self, X):
+        """ Scale the inputs to [-1, 1] with the bounds of the training data.
+
+        :rtype: numpy.ndarray
+        """
+        return 2. * (X - self.lower) / (self.upper - self.lower) - 1.
+
+    def basis(self, X):
+        """ Return the matrix of monomials evaluated at the (scaled) inputs.
+
+        :rtype: numpy.ndarray
+        """
+        Z = self.scale(np.atleast_2d(np.asarray(X, dtype=float)))
+        return np.prod(Z[:, np.newaxis, :] ** self.exponents[np.newaxis],
+                       axis=-1)
+
+    def fit(self, X, samples):
+        """ Fit the response surface.
+
+        :param X: the inputs, one row per sample.
+        :type X: numpy.ndarray
+
+        :param samples: the sampled values, keyed by quantity.
+        :type samples: dict[str, numpy.ndarray]
+
+        :raises Exception: if there are fewer samples than coefficients.
+
+        :rtype: ResponseSurface
+        """
+        X = np.asarray(X, dtype=float)
+        self.lower, self.upper = X.min(axis=0), X.max(axis=0)
+        # Constant inputs are scaled with a unit range.
+        self.upper = np.where(self.upper > self.lower, self.upper,
+                              self.lower + 1.)
+        # A variable sampled at n distinct values supports a polynomial of at
+        # most degree n - 1; higher powers would make the fit ill-posed.
+        self.exponents = monomials([len(np.unique(x)) - 1 for x in X.T],
+                                   self.degree)
+
+        A = self.basis(X)
+        n_samples, n_coefficients = A.shape
+        if n_samples <= n_coefficients:
+            raise Exception('A response surface of degree {} requires more '
+                            'than {} samples, got {}.'
+                            .format(self.degree, n_coefficients, n_samples))
+        self.covariance = np.linalg.pinv(A.T.dot(A))
+
+        for quantity, y in samples.items():
+            y = np.asarray(y, dtype=float)
+            coefficients = np.linalg.lstsq(A, y, rcond=None)[0]
+            residuals = y - A.dot(coefficients)
+            self.coefficients[quantity] = coefficients
+            self.sigma[quantity] = np.sqrt(residuals.dot(residuals) /
+                                           (n_samples - n_coefficients))
+        return self
+
+    def check_bounds(self, X):
+        """ Check that the inputs lie within the range of the training data.
+
+        :raises Exception: if any input is out of range.
+        """
+        X = np.atleast_2d(X)
+        out_of_range = np.any((X < self.lower) | (X > self.upper), axis=0)
+        if np.any(out_of_range):
+            raise Exception(
+                'The requested {} is out of the range of the training data. '
+                'Extrapolation is not supported.'
+                .format(', '.join(name for name, out in
+                                  zip(VARIABLES, out_of_range) if out)))
+
+    def predict(self, X, quantity):
+        """ Return the predicted values of a quantity and their error bounds.
+
+        :param X: the inputs, one row per point.
+        :type X: numpy.ndarray
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :rtype: tuple[numpy.ndarray]
+        """
+        self.check_bounds(X)
+        A = self.basis(X)
+        leverage = np.einsum('ij,jk,ik->i', A, self.covariance, A)
+        bound = self.n_sigma * self.sigma[quantity] * np.sqrt(1. + leverage)
+        return A.dot(self.coefficients[quantity]), bound
+
+    def save(self, path):
+        """ Save the fitted response surface to a .npz file.
+
+        :rtype: None
+        """
+        arrays = dict(('coefficients_' + quantity, coefficients)
+                      for quantity, coefficients in self.coefficients.items())
+        np.savez(path, degree=self.degree, n_sigma=self.n_sigma,
+                 lower=self.lower, upper=self.upper,
+                 exponents=self.exponents, covariance=self.covariance,
+                 quantities=np.array(self.quantities),
+                 sigma=np.array([self.sigma[q] for q in self.quantities]),
+                 **arrays)
+
+    @classmethod
+    def load(cls, path):
+        """ Load a response surface saved with :meth:`save`.
+
+        :rtype: ResponseSurface
+        """
+        data = np.load(path)
+        surface = cls(int(data['degree']), float(data['n_sigma']))
+        surface.lower, surface.upper = data['lower'], data['upper']
+        surface.exponents = data['exponents']
+        surface.covariance = data['covariance']
+        for quantity, sigma in zip(data['quantities'], data['sigma']):
+            quantity = str(quantity)
+            surface.coefficients[quantity] = data['coefficients_' + quantity]
+            surface.sigma[quantity] = float(sigma)
+        return surface
+
+
+def sample_designs(make_aircraft, designs,
+                   quantities=('CDtot', 'Cmtot', 'Alpha')):
+    """ Collect training data from the AVL grids of a set of aircraft
+    designs.
+
+    :param make_aircraft: a function returning an aircraft for a
+        (main_wing_long_pos, tail_scale) design.
+    :type make_aircraft: (float, float) -> classes.aircraft.Aircraft
+
+    :param designs: the (main_wing_long_pos, tail_scale) designs.
+    :type designs: collections.Sequence[tuple[float]]
+
+    :param quantities: the quantities that are sampled.
+    :type quantities: collections.Sequence[str]
+
+    :return: the inputs (see :data:`VARIABLES`) and the sampled values.
+    :rtype: tuple[numpy.ndarray, dict[str, numpy.ndarray]]
+    """
+    X, samples = [], dict((quantity, []) for quantity in quantities)
+    for main_wing_long_pos, tail_scale in designs:
+        database = make_aircraft(main_wing_long_pos, tail_scale).aero_database
+        CLs, delta_es = np.meshgrid(database.CLs, database.delta_es,
+                                    indexing='ij')
+        values = database.get_quantities(CLs.ravel(), delta_es.ravel(),
+                                         quantities)
+        X.append(np.column_stack([CLs.ravel(), delta_es.ravel(),
+                                  np.full(CLs.size, main_wing_long_pos),
+                                  np.full(CLs.size, tail_scale)]))
+        for quantity, value in zip(quantities, values):
+            samples[quantity].append(value)
+
+    return np.vstack(X), dict((quantity, np.concatenate(value))
+                              for quantity, value in samples.items())
+
+
+class SurrogateAeroDatabase(object):
+    """ Serves the aerodynamic quantities of a single design from a
+    :class:`ResponseSurface`, with the interface of an
+    :class:`~classes.analysis.aero_database.AeroDatabase`, such that it can
+    be used in place of the AVL results (e.g. by a
+    :class:`~classes.analysis.trim.TrimSolver`).
+
+    :param surface: the fitted response surface.
+    :type surface: ResponseSurface
+
+    :param main_wing_long_pos: the longitudinal position of the main wing.
+    :type main_wing_long_pos: float
+
+    :param tail_scale: the scale factor of the horizontal tail (chords and
+        span).
+    :type tail_scale: float
+    """
+
+    is_regular_grid = False
+
+    def __init__(self, surface, main_wing_long_pos, tail_scale=1.):
+        self.surface = surface
+        self.design = (main_wing_long_pos, tail_scale)
+        self.CLs = np.array([surface.lower[0], surface.upper[0]])
+        self.delta_es = np.array([surface.lower[1], surface.upper[1]])
+
+    def inputs(self, CLs, delta_es):
+        """ Return the inputs of the response surface.
+
+        :rtype: numpy.ndarray
+        """
+        CLs, delta_es = np.broadcast_arrays(np.asarray(CLs, dtype=float),
+                                            np.asarray(delta_es, dtype=float))
+        return np.column_stack([CLs.ravel(), delta_es.ravel()] +
+                               [np.full(CLs.size, value)
+                                for value in self.design]), CLs.shape
+
+    def get_quantity(self, quantity, CL, delta_e):
+        """ Return a quantity for a given CL (lift coefficient) and delta_e
+        (elevator deflection).
+
+        :rtype: numpy.ndarray
+        """
+        return self.get_quantities(CL, delta_e, (quantity, ))[0]
+
+    def get_quantities(self, CLs, delta_es,
+                       quantities=('CDtot', 'Cmtot', 'Alpha')):
+        """ Return several quantities for (arrays of) CL and delta_e.
+
+        :rtype: tuple[numpy.ndarray]
+        """
+        return tuple(value for value, _ in
+                     self.get_quantities_with_errors(CLs, delta_es,
+                                                     quantities))
+
+    def get_quantities_with_errors(self, CLs, delta_es,
+                                   quantities=('CDtot', 'Cmtot', 'Alpha')):
+        """ Return several quantities for (arrays of) CL and delta_e,
+        together with their error bounds.
+
+        :rtype: list[tuple[numpy.ndarray]]
+        """
+        X, shape = self.inputs(CLs, delta_es)
+        results = []
+        for quantity in quantities:
+            value, bound = self.surface.predict(X, quantity)
+            results.append((value.reshape(shape), bound.reshape(shape)))
+        return results
@@ -0,0 +1,392 @@
+import numpy as np
+
+from classes.analysis.fuel_model import FuelState
+
+
+def evaluate_batch(evaluator, masses, model):
+    """ Evaluate a list of mass arrays of a fuel model with a
+    :class:`~classes.analysis.burn_evaluation.BurnEvaluator`, and return one
+    dict of floats per array.
+
+    :rtype: list[dict[str, float]]
+    """
+    values = evaluator.evaluate_masses(np.array(masses), model)
+    return [dict((name, float(array[i])) for name, array in values.items())
+            for i in range(len(masses))]
+
+
+class _Node(object):
+    """ A partial schedule of the beam search: the fuel masses after a
+    sequence of burns, the elapsed time, the integrated cost and the last
+    evaluation. The sequence itself follows from the parents.
+    """
+
+    __slots__ = ('masses', 'time', 'cost', 'values', 'group', 'duration',
+                 'parent')
+
+    def __init__(self, masses, time, cost, values, group=None, duration=0.,
+                 parent=None):
+        self.masses = masses
+        self.time = time
+        self.cost = cost
+        self.values = values
+        self.group = group
+        self.duration = duration
+        self.parent = parent
+
+    @property
+    def mean_cost(self):
+        """ The cost per unit of time, by which partial schedules of
+        different durations are compared.
+
+        :rtype: float
+        """
+        return self.cost / self.time if self.time > 0. else 0.
+
+
+class Schedule(object):
+    """ A sequence of burns found by a :class:`TankScheduler`.
+
+    :param steps: per burn, the group, the time during which fuel was burnt
+        and the trimmed aerodynamic state before the burn (see
+        :meth:`~classes.analysis.burn_evaluation.BurnEvaluator.
+        evaluate_state`).
+    :type steps: list[dict]
+
+    :param final: the trimmed aerodynamic state after the last burn.
+    :type final: dict
+
+    :param cost: the time integral of the minimised quantity.
+    :type cost: float
+
+    :param state: the fuel state after the last burn.
+    :type state: classes.analysis.fuel_model.FuelState
+    """
+
+    def __init__(self, steps, final, cost, state=None):
+        self.steps = steps
+        self.final = final
+        self.cost = cost
+        self.state = state
+
+    @property
+    def groups(self):
+        """ :rtype: list[str] """
+        return [step['group'] for step in self.steps]
+
+    @property
+    def times(self):
+        """ The durations of the burns.
+
+        :rtype: list[float]
+        """
+        return [step['time'] for step in self.steps]
+
+    @property
+    def duration(self):
+        """ :rtype: float """
+        return sum(self.times)
+
+
+class TankScheduler(object):
+    """ Schedules the burns of a whole mission, minimising the time integral
+    of the (trim) drag, instead of the instantaneous drag after every burn.
+
+    The search is a beam search over the
+    :class:`~classes.analysis.fuel_model.FuelState`\ s: every partial
+    schedule in the beam is extended with a burn from each group that is not
+    empty. Schedules that lead to the same fuel masses (e.g. burning A then B,
+    or B then A) are merged, keeping the cheapest, as in dynamic programming.
+    Of the rest, the ``beam_width`` schedules with the lowest mean cost are
+    kept. All extensions of a step are evaluated in one vectorised pass with
+    :meth:`~classes.analysis.burn_evaluation.BurnEvaluator.evaluate_masses`,
+    which is fast with a :class:`~classes.analysis.trim.LinearTrimModel`.
+
+    A beam width of 1 reproduces the greedy choice of the lowest drag after
+    every burn.
+
+    :param evaluator: the evaluator of the trimmed aerodynamic state.
+    :type evaluator: classes.analysis.burn_evaluation.BurnEvaluator
+
+    :param time_step: the (maximum) duration of a burn in s.
+    :type time_step: float
+
+    :param beam_width: the number of partial schedules kept at every step.
+    :type beam_width: int
+
+    :param key: the minimised quantity, e.g. 'CDi'.
+    :type key: str
+
+    :param decimals: the number of decimals (in kg) up to which fuel masses
+        are considered equal when merging schedules.
+    :type decimals: int
+    """
+
+    def __init__(self, evaluator, time_step, beam_width=10, key='CDi',
+                 decimals=6):
+        self.evaluator = evaluator
+        self.time_step = float(time_step)
+        self.beam_width = int(beam_width)
+        self.key = key
+        self.decimals = decimals
+
+    def _extend(self, node, model, end_time):
+        """ Return the (group, masses, duration) of every burn extending a
+        partial schedule. Groups from which no fuel is drawn (zero fuel
+        flow) are skipped, as burning from them would not change the masses
+        and the schedule would never end.
+
+        :rtype: list[tuple]
+        """
+        time_step = min(self.time_step, end_time - node.time)
+        extensions = []
+        for group in FuelState(model, node.masses).available_groups:
+            state = FuelState(model, node.masses)
+            if np.isinf(state.time_to_empty(group)):
+                continue
+            duration = state.burn(group, time_step)
+            if duration > 0.:
+                extensions.append((group, state.masses, duration))
+        return extensions
+
+    def schedule(self, state, end_time=np.inf):
+        """ Return the schedule of burns from a fuel state until all tanks
+        are empty, or until the end time.
+
+        :param state: the initial fuel state. It is not changed.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :param end_time: the duration of the mission in s.
+        :type end_time: float
+
+        :rtype: Schedule
+        """
+        model = state.model
+        beam = [_Node(state.masses.copy(), 0., 0.,
+                      evaluate_batch(self.evaluator, [state.masses],
+                                     model)[0])]
+        finished = []
+
+        while beam:
+            candidates = []
+            for node in beam:
+                extensions = self._extend(node, model, end_time) \
+                    if node.time < end_time else []
+                if not extensions:
+                    finished.append(node)
+                candidates.extend((node, ) + extension
+                                  for extension in extensions)
+            if not candidates:
+                break
+
+            evaluations = evaluate_batch(self.evaluator,
+                                         [masses for _, _, masses, _
+                                          in candidates], model)
+            merged = {}
+            for (parent, group, masses, duration), values in zip(
+                    candidates, evaluations):
+                # Trapezoidal integration of the cost over the burn.
+                cost = parent.cost + 0.5 * duration * (
+                    parent.values[self.key] + values[self.key])
+                node = _Node(masses, parent.time + duration, cost, values,
+                             group, duration, parent)
+                signature = tuple(np.round(masses, self.decimals))
+                if signature not in merged or cost < merged[signature].cost:
+                    merged[signature] = node
+
+            beam = sorted(merged.values(),
+                          key=lambda node: node.mean_cost)[:self.beam_width]
+
+        return self._backtrack(min(finished, key=lambda node: node.cost),
+                               model)
+
+    @staticmethod
+    def _backtrack(node, model):
+        """ Convert the final node of the search into a :class:`Schedule`.
+
+        :rtype: Schedule
+        """
+        final, cost = node.values, node.cost
+        state = FuelState(model, node.masses)
+        steps = []
+        while node.parent is not None:
+            step = dict(node.parent.values)
+            step.update(group=node.group, time=node.duration)
+            steps.append(step)
+            node = node.parent
+        return Schedule(steps[::-1], final, cost, state)
+
+
+class EventDrivenScheduler(object):
+    """ Simulates the greedy choice of tanks (the group with the lowest drag
+    after a short probe burn) with variable time steps. Instead of fixed
+    steps, every step runs up to the next decision point:
+
+    * the tank in use runs empty,
+    * the choice of tank changes, i.e. the drag curves of two groups cross,
+      which is located by bisection up to ``min_step``,
+    * the end time is reached, or
+    * the step reaches ``max_step``.
+
+    When the drag curves of two groups run in parallel, the greedy choice
+    alternates between them at every probe. A tank is therefore used for at
+    least ``min_dwell`` (unless it runs empty or the mission ends), such that
+    the alternation takes steps of that duration, instead of many tiny ones.
+
+    A step is halved until the drag and the x-coordinate of the centre of
+    gravity at its midpoint deviate less than the tolerances from the linear
+    interpolation between its ends, such that the histories are accurate.
+    A long mission then takes a few dozen steps, with accurate switching
+    times.
+
+    :param evaluator: the evaluator of the trimmed aerodynamic state.
+    :type evaluator: classes.analysis.burn_evaluation.BurnEvaluator
+
+    :param max_step: the maximum duration of a step in s.
+    :type max_step: float
+
+    :param min_step: the resolution of the switching times in s.
+    :type min_step: float
+
+    :param min_dwell: the minimum duration of a step in s, see above.
+    :type min_dwell: float
+
+    :param probe_step: the duration of the probe burns that determine the
+        choice of tank, in s.
+    :type probe_step: float
+
+    :param drag_tolerance: the tolerance on the interpolated drag.
+    :type drag_tolerance: float
+
+    :param cog_tolerance: the tolerance on the interpolated x-coordinate of
+        the centre of gravity, in m.
+    :type cog_tolerance: float
+
+    :param key: the minimised quantity, e.g. 'CDi'.
+    :type key: str
+    """
+
+    def __init__(self, evaluator, max_step=3600., min_step=1.,
+                 min_dwell=60., probe_step=1., drag_tolerance=1e-5,
+                 cog_tolerance=1e-3, key='CDi'):
+        self.evaluator = evaluator
+        self.max_step = float(max_step)
+        self.min_step = float(min_step)
+        self.min_dwell = float(min_dwell)
+        self.probe_step = float(probe_step)
+        self.drag_tolerance = drag_tolerance
+        self.cog_tolerance = cog_tolerance
+        self.key = key
+        self.n_evaluations = 0
+
+    def _evaluate(self, states):
+        """ Evaluate a list of fuel states.
+
+        :rtype: list[dict[str, float]]
+        """
+        self.n_evaluations += len(states)
+        return evaluate_batch(self.evaluator,
+                              [state.masses for state in states],
+                              states[0].model)
+
+    def choice(self, state):
+        """ Return the group with the lowest drag after a probe burn, or None
+        if all tanks are empty. Groups from which no fuel is drawn (zero fuel
+        flow) are not chosen, as they would never run empty.
+
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :rtype: str | None
+        """
+        candidates = []
+        for group in state.available_groups:
+            if np.isinf(state.time_to_empty(group)):
+                continue
+            probe, duration = state.burnt(group, self.probe_step)
+            if duration > 0.:
+                candidates.append((group, probe))
+        if not candidates:
+            return None
+        values = self._evaluate([probe for _, probe in candidates])
+        i = int(np.argmin([value[self.key] for value in values]))
+        return candidates[i][0]
+
+    def _deviation(self, state, group, step, values, end_values):
+        """ Return whether the midpoint of a step deviates more than the
+        tolerances from the linear interpolation between its ends.
+
+        :rtype: bool
+        """
+        middle, = self._evaluate([state.burnt(group, 0.5 * step)[0]])
+        return (abs(middle[self.key] - 0.5 * (values[self.key] +
+                                              end_values[self.key])) >
+                self.drag_tolerance or
+                abs(middle['cog'] - 0.5 * (values['cog'] +
+                                           end_values['cog'])) >
+                self.cog_tolerance)
+
+    def _switch_time(self, state, group, step):
+        """ Return the time within a step at which the choice of tank
+        changes from a group, up to :attr:`min_step`, but not before
+        :attr:`min_dwell`.
+
+        :rtype: float
+        """
+        low, high = min(self.min_dwell, step), step
+        while high - low > self.min_step:
+            middle = 0.5 * (low + high)
+            if self.choice(state.burnt(group, middle)[0]) == group:
+                low = middle
+            else:
+                high = middle
+        return high
+
+    def schedule(self, state, end_time=np.inf):
+        """ Return the schedule of burns from a fuel state until all tanks
+        are empty, or until the end time.
+
+        :param state: the initial fuel state. It is not changed.
+        :type state: classes.analysis.fuel_model.FuelState
+
+        :param end_time: the duration of the mission in s.
+        :type end_time: float
+
+        :rtype: Schedule
+        """
+        values, = self._evaluate([state])
+        steps, time, cost = [], 0., 0.
+
+        while time < end_time:
+            group = self.choice(state)
+            if group is None:
+                break
+
+            # The first decision points: the tank runs empty, the end time.
+            step = min(self.max_step, end_time - time,
+                       state.time_to_empty(group))
+            while True:
+                end, step = state.burnt(group, step)
+                end_values, = self._evaluate([end])
+                if step <= self.min_dwell or not self._deviation(
+                        state, group, step, values, end_values):
+                    break
+                step = max(0.5 * step, self.min_dwell)
+
+            # The next decision point: the choice of tank changes. If the
+            # tank runs empty at the end of the step, the choice changes
+            # there anyway, so the choice is checked just before.
+            check = step - self.min_step if end.time_to_empty(group) <= 0. \
+                else step
+            if check > self.min_dwell and self.choice(
+                    state.burnt(group, check)[0]) not in (group, None):
+                step = self._switch_time(state, group, check)
+                end, step = state.burnt(group, step)
+                end_values, = self._evaluate([end])
+
+            record = dict(values)
+            record.update(group=group, time=step)
+            steps.append(record)
+            cost += 0.5 * step * (values[self.key] + end_values[self.key])
+            state, values, time = end, end_values, time + step
+
+        return Schedule(steps, values, cost, state)
@@ -0,0 +1,239 @@
+import numpy as np
+from scipy.optimize import brentq
+
+
+class TrimSolver(object):
+    """ Solves for the elevator deflection at which the aerodynamic
+    pitching moment balances the weight-induced pitching moment, using the
+    interpolants of an :class:`~classes.analysis.aero_database.AeroDatabase`.
+
+    Because the database interpolates linearly between the elevator
+    deflections of the AVL grid, Cm is piecewise linear in delta_e for a
+    fixed CL. The grid cell in which the moment residual changes sign is
+    therefore inverted in closed form. The cell of the previous solution is
+    tried first (warm start), as the trim point moves only slightly between
+    successive fuel states. Databases without a regular elevator grid fall
+    back to a secant step from the previous solution, followed by Brent's
+    method.
+
+    :param aero_database: the database providing the 'Cmtot' quantity.
+    :type aero_database: classes.analysis.aero_database.AeroDatabase
+
+    :param tolerance: the convergence tolerance on the moment coefficient.
+    :type tolerance: float
+    """
+
+    def __init__(self, aero_database, tolerance=1e-4):
+        self.aero_database = aero_database
+        self.tolerance = tolerance
+
+        self.last_delta_e = None
+        self.n_calls = 0
+        self.n_evaluations = 0
+        self.last_n_evaluations = 0
+
+    @property
+    def stats(self):
+        """ The iteration statistics of this solver. An evaluation is one
+        (possibly vectorised) query of the aerodynamic database.
+
+        :rtype: dict
+        """
+        return {'calls': self.n_calls,
+                'evaluations': self.n_evaluations,
+                'last_evaluations': self.last_n_evaluations,
+                'mean_evaluations': (float(self.n_evaluations) / self.n_calls
+                                     if self.n_calls else 0.)}
+
+    @property
+    def bounds(self):
+        """ The range of elevator deflections in the database.
+
+        :rtype: tuple[float]
+        """
+        delta_es = self.aero_database.delta_es
+        return float(delta_es[0]), float(delta_es[-1])
+
+    def residual(self, CL, weight_cm, delta_e):
+        """ Return the total pitching moment coefficient for (an array of)
+        elevator deflection(s).
+
+        :rtype: numpy.ndarray
+        """
+        self.last_n_evaluations += 1
+        Cm, = self.aero_database.get_quantities(CL, delta_e, ('Cmtot', ))
+        return weight_cm + Cm
+
+    def solve(self, CL, weight_cm, max_iter=50):
+        """ Return the elevator deflection for which the aircraft is trimmed.
+        If the aircraft cannot be trimmed within the range of elevator
+        deflections, the deflection with the smallest residual moment is
+        returned.
+
+        :param CL: lift coefficient
+        :type CL: float
+
+        :param weight_cm: the weight-induced pitching moment coefficient.
+        :type weight_cm: float
+
+        :param max_iter: the maximum number of iterations of the fallback
+            root finder.
+        :type max_iter: int
+
+        :rtype: float
+        """
+        self.last_n_evaluations = 0
+
+        if getattr(self.aero_database, 'is_regular_grid', True):
+            delta_e = self._solve_on_grid(CL, weight_cm)
+        else:
+            delta_e = self._solve_iteratively(CL, weight_cm, max_iter)
+
+        self.last_delta_e = delta_e
+        self.n_calls += 1
+        self.n_evaluations += self.last_n_evaluations
+        return delta_e
+
+    def _solve_on_grid(self, CL, weight_cm):
+        """ Invert the piecewise linear Cm(delta_e) in closed form.
+
+        :rtype: float
+        """
+        nodes = self.aero_database.delta_es
+
+        if self.last_delta_e is not None:
+            i = int(np.clip(np.searchsorted(nodes, self.last_delta_e) - 1,
+                            0, len(nodes) - 2))
+            cell = self.residual(CL, weight_cm, nodes[i:i + 2])
+            if cell[0] * cell[1] <= 0.:
+                return self._invert(nodes[i:i + 2], cell)
+
+        residuals = self.residual(CL, weight_cm, nodes)
+        sign_changes = np.nonzero(residuals[:-1] * residuals[1:] <= 0.)[0]
+
+        if len(sign_changes) == 0:
+            return float(nodes[np.argmin(np.abs(residuals))])
+
+        i = sign_changes[0]
+        return self._invert(nodes[i:i + 2], residuals[i:i + 2])
+
+    @staticmethod
+    def _invert(delta_es, residuals):
+        """ Return the zero of the line through two (delta_e, residual)
+        points.
+
+        :rtype: float
+        """
+        if residuals[1] == residuals[0]:
+            return float(delta_es[0])
+        return float(delta_es[0] - residuals[0] * (delta_es[1] - delta_es[0])
+                     / (residuals[1] - residuals[0]))
+
+    def _solve_iteratively(self, CL, weight_cm, max_iter):
+        """ Find the trim deflection with a secant step from the previous
+        solution, falling back to Brent's method on the full range.
+
+        :rtype: float
+        """
+        lower, upper = self.bounds
+
+        def f(delta_e):
+            return float(self.residual(CL, weight_cm, delta_e))
+
+        if self.last_delta_e is not None:
+            x0 = self.last_delta_e
+            x1 = min(x0 + 0.01 * (upper - lower), upper)
+            if x1 == x0:
+                x1 = x0 - 0.01 * (upper - lower)
+            f0, f1 = f(x0), f(x1)
+            if f1 != f0:
+                x2 = x1 - f1 * (x1 - x0) / (f1 - f0)
+                if lower <= x2 <= upper and abs(f(x2)) <= self.tolerance:
+                    return x2
+
+        f_lower, f_upper = f(lower), f(upper)
+        if f_lower * f_upper > 0.:
+            return lower if abs(f_lower) < abs(f_upper) else upper
+
+        return brentq(f, lower, upper, xtol=1e-6, maxiter=max_iter)
+
+
+class LinearTrimModel(object):
+    """ A linearised trim model. For every CL of the AVL grid, the pitching
+    moment is linearised around a reference elevator deflection, using the
+    stability and control derivatives of the
+    :class:`~classes.analysis.aero_database.AeroDatabase`. At a constant CL,
+    the slope of Cm with respect to delta_e is::
+
+        dCm/ddelta_e = Cm_delta_e - Cm_alpha * CL_delta_e / CL_alpha
+
+    such that the trim deflection follows analytically, for whole arrays of
+    lift coefficients and weight-induced moments at once. The model is meant
+    to screen many fuel states quickly; use :meth:`validate` to compare it
+    with a :class:`TrimSolver`.
+
+    :param aero_database: the database providing 'Cmtot' and the
+        stability and control derivatives.
+    :type aero_database: classes.analysis.aero_database.AeroDatabase
+
+    :param delta_e_ref: the elevator deflection around which the moment is
+        linearised. The nearest deflection of the grid is used.
+    :type delta_e_ref: float
+    """
+
+    def __init__(self, aero_database, delta_e_ref=0.):
+        self.aero_database = aero_database
+        nodes = aero_database.delta_es
+        self.delta_e_ref = float(nodes[np.argmin(np.abs(nodes - delta_e_ref))])
+        self.CLs = aero_database.CLs
+
+        Cm, CL_alpha, Cm_alpha, CL_delta_e, Cm_delta_e = \
+            aero_database.get_quantities(
+                self.CLs, self.delta_e_ref,
+                ('Cmtot', 'CL_alpha', 'Cm_alpha', 'CL_delta_e', 'Cm_delta_e'))
+        self.Cm_ref = Cm
+        self.Cm_delta_e = Cm_delta_e - Cm_alpha * CL_delta_e / CL_alpha
+
+    def solve(self, CL, weight_cm):
+        """ Return the elevator deflection(s) for which the linearised
+        moment balances the weight-induced moment(s). Like those of a
+        :class:`TrimSolver`, they are limited to the range of the database.
+
+        :param CL: (an array of) lift coefficient(s).
+        :type CL: float | numpy.ndarray
+
+        :param weight_cm: (an array of) weight-induced pitching moment
+            coefficient(s).
+        :type weight_cm: float | numpy.ndarray
+
+        :rtype: float | numpy.ndarray
+        """
+        Cm = np.interp(CL, self.CLs, self.Cm_ref)
+        slope = np.interp(CL, self.CLs, self.Cm_delta_e)
+        delta_es = self.aero_database.delta_es
+        return np.clip(self.delta_e_ref - (weight_cm + Cm) / slope,
+                       delta_es[0], delta_es[-1])
+
+    def validate(self, CLs, weight_cms, tolerance=1e-4):
+        """ Return the differences between the deflections of this model and
+        those of a (fresh) :class:`TrimSolver` on the same database.
+
+        :param CLs: the lift coefficients.
+        :type CLs: collections.Sequence[float] | numpy.ndarray
+
+        :param weight_cms: the weight-induced pitching moment coefficients.
+        :type weight_cms: collections.Sequence[float] | numpy.ndarray
+
+        :param tolerance: the convergence tolerance of the trim solver.
+        :type tolerance: float
+
+        :rtype: numpy.ndarray
+        """
+        CLs, weight_cms = np.broadcast_arrays(np.asarray(CLs, dtype=float),
+                                              np.asarray(weight_cms,
+                                                         dtype=float))
+        solver = TrimSolver(self.aero_database, tolerance)
+        full = np.array([solver.solve(CL, weight_cm)
+                         for CL, weight_cm in zip(CLs.ravel(),
+                                                  weight_cms.ravel())])
+        return self.solve(CLs, weight_cms) - full.reshape(CLs.shape)
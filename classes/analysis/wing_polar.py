@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def case_name(alpha):
+    """ Return the name of the AVL run case of a wing for a given angle of
+    attack, as it is used as a key in the AVL results.
+
+    :param alpha: angle of attack in degrees
+    :type alpha: float | int
+
+    :rtype: str
+    """
+    return 'alpha_{0:0.1f}'.format(float(alpha))
+
+
+class WingPolar(object):
+    """ The polar of a wing: the AVL 'Totals' as arrays over the angles of
+    attack at which AVL was run. The arrays are built once, in a single pass
+    over the AVL results, and serve both the interpolation of the
+    quantities and the linear fits of the lift and drag curves.
+
+    :param results: the AVL results, keyed by :func:`case_name`.
+    :type results: dict
+
+    :param alphas: the (sorted) angles of attack of the AVL cases.
+    :type alphas: collections.Sequence[float] | numpy.ndarray
+    """
+
+    def __init__(self, results, alphas):
+        self.alphas = np.asarray(alphas, dtype=float)
+        totals = [results[case_name(alpha)]['Totals'] for alpha in self.alphas]
+        self.quantities = dict(
+            (quantity, np.array([total[quantity] for total in totals]))
+            for quantity in totals[0])
+        self._fits = {}
+
+    @property
+    def CL(self):
+        """ :rtype: numpy.ndarray """
+        return self.quantities['CLtot']
+
+    @property
+    def CD(self):
+        """ :rtype: numpy.ndarray """
+        return self.quantities['CDtot']
+
+    @property
+    def Cm(self):
+        """ :rtype: numpy.ndarray """
+        return self.quantities['Cmtot']
+
+    def get_quantity(self, quantity, alpha):
+        """ Return (an array of) the linearly interpolated value(s) of a
+        quantity at (an array of) angle(s) of attack.
+
+        :param quantity: the quantity that is requested
+        :type quantity: str
+
+        :param alpha: angle of attack in degrees
+        :type alpha: float | numpy.ndarray
+
+        :rtype: float | numpy.ndarray
+        """
+        return np.interp(alpha, self.alphas, self.quantities[quantity])
+
+    def fit(self, quantity, degree=1):
+        """ Return the (cached) coefficients of the least-squares polynomial
+        fit of a quantity against the angle of attack, highest power first.
+
+        :param quantity: the quantity that is fitted
+        :type quantity: str
+
+        :param degree: the degree of the polynomial.
+        :type degree: int
+
+        :rtype: numpy.ndarray
+        """
+        try:
+            return self._fits[quantity, degree]
+        except KeyError:
+            coefficients = np.polyfit(self.alphas, self.quantities[quantity],
+                                      degree)
+            self._fits[quantity, degree] = coefficients
+            return coefficients
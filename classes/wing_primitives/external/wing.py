@@ -6,6 +6,7 @@ from os.path import join, dirname
 from parapy.core import *
 from parapy.geom import *
 import math
+from classes.analysis.wing_polar import WingPolar, case_name
 from classes.engines.engine import Engine
 from classes.wing_primitives.external.airfoil import \
     IntersectedAirfoil
@@ -18,6 +19,8 @@ from classes.wing_primitives.structural_elements.rib import (
 )
 from classes.wing_primitives.structural_elements.spar import \
     FusedSpar
+from tools.avl_cache import AVLCache
+from tools.avl_parallel import run_parallel
 
 
 class Wing(SewnShell):
@@ -107,6 +110,14 @@ class Wing(SewnShell):
 
     # Fuel tank input
     fuel_tank_boundaries = Input(validator=val.all_is_number)
+    #: The fuel flow drawn from each of the fuel tanks when it is used, in
+    #: kg/s. It is set by the aircraft from its fuel feed (see
+    #: :attr:`classes.aircraft.Aircraft.fuel_flows`).
+    tank_fuel_flow = Input(0., validator=val.Range(0, float('inf')))
+    #: The fidelity of the fuel model of the fuel tanks, 'point', 'table' or
+    #: 'exact' (see :attr:`~classes.wing_primitives.fuel.fuel_tank.FuelTank.
+    #: fuel_fidelity`).
+    fuel_fidelity = Input('table')
 
     # Movable input
     n_movables = Input(validator=lambda x: isinstance(x, int))
@@ -186,6 +197,9 @@ class Wing(SewnShell):
     avl_alpha_start = Input(0., validator=val.is_number)
     avl_alpha_end = Input(10., validator=val.is_number)
     avl_alpha_step = Input(0.5, validator=val.is_number)
+    avl_cache_directory = Input(join(getcwd(), 'output', 'avl_cache'))
+    avl_cache_refresh = Input(False)
+    avl_n_processes = Input(1, validator=lambda x: isinstance(x, int))
     transparency = Input(0.8)
     color = Input('white')
     name = Input('wing')
@@ -254,6 +268,8 @@ class Wing(SewnShell):
     def fuel_tanks(self):
         return FuelTank(self, self.fuel_tank_boundaries[child.index],
                         self.fuel_tank_boundaries[child.index + 1],
+                        fuel_flow=self.tank_fuel_flow,
+                        fuel_fidelity=self.fuel_fidelity,
                         quantify=len(self.fuel_tank_boundaries) - 1
                         if len(self.fuel_tank_boundaries) != 0 else 0)
 
@@ -535,6 +551,20 @@ class Wing(SewnShell):
         return avl.Interface(cases=self.cases,
                              configuration=self.avl_configuration)
 
+    @Attribute
+    def avl_results(self):
+        """ The AVL results of all :any:`cases`. These are loaded from the
+        on-disk cache in :any:`avl_cache_directory` if this configuration
+        has been analysed before, unless :any:`avl_cache_refresh` is set.
+
+        :rtype: dict
+        """
+        if self.avl_cache_directory is None:
+            return self.run_avl()
+        return AVLCache(self.avl_cache_directory).get_or_run(
+            self.avl_configuration, self.cases, self.run_avl,
+            refresh=self.avl_cache_refresh)
+
     @Attribute
     def avl_surface(self):
         """ Return the AVL Surface geometry. This representation is required
@@ -589,12 +619,29 @@ class Wing(SewnShell):
 
         """
         return [avl.Case(
-            name='alpha_{0:0.1f}'.format(alpha),
+            name=case_name(alpha),
             settings={'alpha': avl.Parameter(name='alpha',
                                              value=alpha)})
-                for alpha in np.arange(self.avl_alpha_start,
-                                       self.avl_alpha_end,
-                                       self.avl_alpha_step)]
+                for alpha in self.avl_alphas]
+
+    @Attribute
+    def avl_alphas(self):
+        """ The angles of attack at which the AVL cases are run.
+
+        :rtype: numpy.ndarray
+        """
+        return np.arange(self.avl_alpha_start, self.avl_alpha_end,
+                         self.avl_alpha_step)
+
+    @Attribute
+    def polar(self):
+        """ The polar of this wing, built once from the AVL results. It
+        serves :any:`get_quantity` and the fits of :any:`CL_0`,
+        :any:`CL_alpha` and :any:`CD_0`.
+
+        :rtype: classes.analysis.wing_polar.WingPolar
+        """
+        return WingPolar(self.avl_results, self.avl_alphas)
 
     @Attribute
     def CL_0(self):
@@ -602,10 +649,7 @@ class Wing(SewnShell):
 
         :rtype: float
         """
-        alphas = np.arange(self.avl_alpha_start, self.avl_alpha_end,
-                           self.avl_alpha_step)
-        CLs = [self.get_CL(alpha) for alpha in alphas]
-        return np.polyfit(alphas, CLs, 1)[-1]
+        return self.polar.fit('CLtot')[-1]
 
     @Attribute
     def CD_0(self):
@@ -613,10 +657,7 @@ class Wing(SewnShell):
 
         :rtype: float
         """
-        alphas = np.arange(self.avl_alpha_start, self.avl_alpha_end,
-                           self.avl_alpha_step)
-        CDs = [self.get_CD(alpha) for alpha in alphas]
-        return np.polyfit(alphas, CDs, 1)[-1]
+        return self.polar.fit('CDtot')[-1]
 
     @Attribute
     def Cm_0(self):
@@ -638,10 +679,7 @@ class Wing(SewnShell):
 
         :rtype: float
         """
-        alphas = np.arange(self.avl_alpha_start, self.avl_alpha_end,
-                           self.avl_alpha_step)
-        CLs = [self.get_CL(alpha) for alpha in alphas]
-        return np.polyfit(alphas, CLs, 1)[0]
+        return self.polar.fit('CLtot')[0]
 
     def get_CL(self, alpha):
         """ Return the lift coefficient for a given alpha (angle of attack).
@@ -703,13 +741,19 @@ class Wing(SewnShell):
                         self.avl_alpha_start, self.avl_alpha_end)
             )
 
-        alphas = np.arange(self.avl_alpha_start, self.avl_alpha_end,
-                           self.avl_alpha_step)
-        values = [self.avl_analysis.results
-                  ['alpha_{0:0.1f}'.format(float(_alpha))]['Totals'][quantity]
-                  for _alpha in alphas]
+        return self.polar.get_quantity(quantity, alpha)
+
+    def run_avl(self):
+        """ Run AVL for all :any:`cases`. If :any:`avl_n_processes` is larger
+        than one, the cases are partitioned over a pool of independent AVL
+        runs, whose results are merged.
 
-        return np.interp(alpha, alphas, values)
+        :rtype: dict
+        """
+        if self.avl_n_processes > 1:
+            return run_parallel(self.avl_configuration, self.cases,
+                                self.avl_n_processes)
+        return self.avl_analysis.results
 
     def get_custom_avl_results(self, alpha, show_trefftz_plot=False,
                                show_geometry=False, **kwargs):
@@ -0,0 +1,168 @@
+class FreeSurfaceSolver(object):
+    """ Solves for the height of the (horizontal) free surface at which the
+    volume below it equals the fuel volume.
+
+    The volume is monotone in the height, so the root is always bracketed by
+    the bottom (empty) and the top (full) of the tank, without evaluating the
+    volume there. Between successive burns the free surface moves only
+    slightly, so the solver starts from the previous height and takes a
+    secant step with the previous slope (the free-surface area). If that does
+    not converge, the bracket is reduced with the Illinois variant of the
+    regula falsi method, which is safeguarded by the bracket.
+
+    :param volume_at: the function returning the volume below a height.
+    :type volume_at: (float) -> float
+
+    :param bottom: the height of the bottom of the tank.
+    :type bottom: float
+
+    :param top: the height of the top of the tank.
+    :type top: float
+
+    :param max_volume: the volume of the tank.
+    :type max_volume: float
+
+    :param tolerance: the convergence tolerance on the relative volume error.
+    :type tolerance: float
+
+    :param max_iter: the maximum number of volume evaluations per solve.
+    :type max_iter: int
+    """
+
+    def __init__(self, volume_at, bottom, top, max_volume, tolerance=1e-5,
+                 max_iter=50):
+        self.volume_at = volume_at
+        self.bottom = bottom
+        self.top = top
+        self.max_volume = max_volume
+        self.tolerance = tolerance
+        self.max_iter = max_iter
+
+        self.last_height = None
+        self.last_volume = None
+        self.last_slope = None
+        self.n_calls = 0
+        self.n_evaluations = 0
+        self.last_n_evaluations = 0
+
+    @property
+    def stats(self):
+        """ The iteration statistics of this solver. An evaluation is one
+        computation of the volume below a height.
+
+        :rtype: dict
+        """
+        return {'calls': self.n_calls,
+                'evaluations': self.n_evaluations,
+                'last_evaluations': self.last_n_evaluations,
+                'mean_evaluations': (float(self.n_evaluations) / self.n_calls
+                                     if self.n_calls else 0.)}
+
+    @property
+    def warm_start(self):
+        """ The values from which the next solve starts: the previous height,
+        volume and slope. They can be stored and assigned to a new solver,
+        e.g. to resume a simulation.
+
+        :rtype: tuple
+        """
+        return self.last_height, self.last_volume, self.last_slope
+
+    @warm_start.setter
+    def warm_start(self, values):
+        self.last_height, self.last_volume, self.last_slope = values
+
+    def solve(self, volume):
+        """ Return the free-surface height for a fuel volume.
+
+        :param volume: the fuel volume.
+        :type volume: float
+
+        :rtype: float
+        """
+        self.last_n_evaluations = 0
+        if volume <= 0.:
+            height = self.bottom
+        elif volume >= self.max_volume:
+            height = self.top
+        else:
+            height = self._solve(volume)
+        self.n_calls += 1
+        self.n_evaluations += self.last_n_evaluations
+        return height
+
+    def _solve(self, volume):
+        """ Find the height for a volume strictly between empty and full.
+
+        :rtype: float
+        """
+        tolerance = self.tolerance * volume
+        evaluated = []
+
+        def f(height):
+            self.last_n_evaluations += 1
+            residual = self.volume_at(height) - volume
+            evaluated.append((height, residual))
+            return residual
+
+        # The bracket, with the residuals of the empty and full tank.
+        a, fa = self.bottom, -volume
+        b, fb = self.top, self.max_volume - volume
+
+        def update(x, fx):
+            if fx < 0.:
+                return x, fx, b, fb
+            return a, fa, x, fx
+
+        # Warm start: the volume at the previous height is (within the
+        # tolerance) the previous volume, so a secant step with the previous
+        # slope can be taken without evaluating the volume there.
+        if self.last_height is not None and a < self.last_height < b:
+            x = self.last_height
+            fx = self.last_volume - volume
+            if abs(fx) <= tolerance:
+                return self._store(x, volume, evaluated)
+            a, fa, b, fb = update(x, fx)
+            if self.last_slope:
+                x_new = x - fx / self.last_slope
+                if a < x_new < b:
+                    fx_new = f(x_new)
+                    if abs(fx_new) <= tolerance:
+                        return self._store(x_new, volume, evaluated)
+                    evaluated.insert(0, (x, fx))
+                    a, fa, b, fb = update(x_new, fx_new)
+
+        # Illinois: halve the residual of an endpoint that is retained twice.
+        side = 0
+        x = a
+        while self.last_n_evaluations < self.max_iter:
+            x = (a * fb - b * fa) / (fb - fa)
+            fx = f(x)
+            if abs(fx) <= tolerance:
+                break
+            if fx < 0.:
+                a, fa = x, fx
+                if side == -1:
+                    fb *= 0.5
+                side = -1
+            else:
+                b, fb = x, fx
+                if side == 1:
+                    fa *= 0.5
+                side = 1
+
+        return self._store(x, volume, evaluated)
+
+    def _store(self, height, volume, evaluated):
+        """ Store the solution and the slope through the last two
+        evaluations, for the warm start of the next solve.
+
+        :rtype: float
+        """
+        self.last_height = height
+        self.last_volume = volume
+        if len(evaluated) > 1:
+            (x0, f0), (x1, f1) = evaluated[-2:]
+            if x1 != x0 and f1 != f0:
+                self.last_slope = (f1 - f0) / (x1 - x0)
+        return height
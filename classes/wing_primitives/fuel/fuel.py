@@ -3,9 +3,14 @@ from os.path import dirname, join
 import pandas as pd
 import numpy as np
 from parapy.core import *
-from parapy.core.globs import Undefined
 from parapy.geom import *
 
+from classes.wing_primitives.fuel.free_surface import FreeSurfaceSolver
+from classes.wing_primitives.fuel.fuel_level_table import (FuelLevelTable,
+                                                            cut_at_height,
+                                                            height_bounds,
+                                                            volume_below)
+
 
 class Fuel(SubtractedSolid):
 
@@ -28,8 +33,39 @@ class Fuel(SubtractedSolid):
     transparency = Input(0.75)
     # fuel_burn_plane_increment_distance = Input(0.01)
     on_invalid = Input('warn')
+    exact_method = Input('secant', validator=val.OneOf(['secant',
+                                                        'bisection']))
+    #: The fuel flow drawn from this tank when it is used, in kg/s. It is
+    #: passed down from the fuel feed of the aircraft (see
+    #: :attr:`classes.aircraft.Aircraft.fuel_flows`).
+    fuel_flow = Input(0., validator=val.Range(0, float('inf')))
     convergence_tol = 1e-5
 
+    @Input
+    def level_table(self):
+        """ The table of fuel volumes and centroids versus free-surface
+        height of the tank. It only depends on the tank geometry, and is
+        normally supplied by the owning
+        :class:`~classes.wing_primitives.fuel.fuel_tank.FuelTank`.
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable
+        """
+        return FuelLevelTable.from_solid(self.tank_solid)
+
+    @Input
+    def free_surface_solver(self):
+        """ The warm-started solver used by :any:`exact_tool`. It only
+        depends on the tank geometry, and is normally supplied by the owning
+        :class:`~classes.wing_primitives.fuel.fuel_tank.FuelTank`, such that
+        it survives changes of the fuel mass.
+
+        :rtype: classes.wing_primitives.fuel.free_surface.FreeSurfaceSolver
+        """
+        bottom, top = height_bounds(self.tank_solid)
+        return FreeSurfaceSolver(
+            lambda height: volume_below(self.tank_solid, height),
+            bottom, top, abs(self.tank_solid.volume), self.convergence_tol)
+
     __initargs__ = ['tank_solid']
 
     @Input
@@ -80,8 +116,60 @@ class Fuel(SubtractedSolid):
     def shape_in(self):
         return self.tank_solid
 
+    @Attribute
+    def height(self):
+        """ The height of the free surface of the fuel, from the
+        :any:`level_table`, which may be interpolated or exact (see
+        :attr:`~classes.wing_primitives.fuel.fuel_tank.FuelTank.
+        fuel_fidelity`).
+
+        :rtype: float
+        """
+        return float(self.level_table.height(self.volume))
+
     @Attribute
     def tool(self):
+        """ The half space solid above the free surface of the fuel, at the
+        :any:`height` from the :any:`level_table`. Note that if
+        the wing is canted, the tool is still kept horizontal with respect to
+        the global axis system, such that fuel is burnt and redistributed as
+        would be expected due to gravity.
+
+        :rtype: parapy.geom.occ.halfspace.HalfSpaceSolid
+        """
+        return cut_at_height(self.tank_solid, self.height)[1]
+
+    @Attribute
+    def cog(self):
+        """ The centre of gravity of the fuel, from the :any:`level_table`,
+        such that no boolean operation is required unless the table is
+        exact.
+
+        :rtype: parapy.geom.generic.positioning.Point
+        """
+        return Point(*self.level_table.cog(self.volume))
+
+    @Attribute
+    def exact_tool(self):
+        """ The half space solid above the exact free surface of the fuel,
+        found with OCC booleans. This is the exact (but expensive)
+        counterpart of :any:`tool`, which may be used to verify the
+        :any:`level_table`.
+
+        If :any:`exact_method` is 'secant', the height is found by the
+        warm-started :any:`free_surface_solver`, whose iteration counts are
+        available through ``free_surface_solver.stats``. Otherwise, the
+        bisection of :any:`bisection_tool` is used.
+
+        :rtype: parapy.geom.occ.halfspace.HalfSpaceSolid
+        """
+        if self.exact_method == 'bisection':
+            return self.bisection_tool
+        height = self.free_surface_solver.solve(self.volume)
+        return cut_at_height(self.tank_solid, height)[1]
+
+    @Attribute
+    def bisection_tool(self):
         """ This tool calculates the required position of the half space
         solid that is used to generate the fuel geometry, modelled with a
         solid. The half space solid is set at the midpoint of the interval
@@ -150,20 +238,7 @@ class Fuel(SubtractedSolid):
         :type time_step: float
         :rtype: None | float
         """
-        wing = self.parent.parent
-
-        if wing.engines is Undefined:
-            aircraft = wing.parent
-            if wing.name.startswith('vertical'):
-                engines = aircraft.main_wing_starboard.engines + \
-                          aircraft.main_wing_port.engines
-            else:
-                engines = aircraft.main_wing_starboard.engines
-        else:
-            engines = wing.engines
-
-        fuel_flow_tot = sum(engine.thrust * engine.specific_fuel_consumption
-                            for engine in engines)
+        fuel_flow_tot = self.fuel_flow
 
         if self.mass >= time_step * fuel_flow_tot:
             # print 'mass: {}, time_step: {}, fuel_flow_tot: {}'.format(
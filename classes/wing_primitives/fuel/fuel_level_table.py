@@ -0,0 +1,310 @@
+import numpy as np
+from parapy.geom import HalfSpaceSolid, Plane, Point, SubtractedSolid
+
+
+def cut_at_height(solid, height):
+    """ Return the part of a solid below a horizontal plane at a certain
+    height, together with the half space solid above this plane.
+
+    :param solid: the solid that is cut.
+    :type solid: parapy.geom.occ.solid.Solid_
+
+    :param height: the z-coordinate of the plane.
+    :type height: float
+
+    :rtype: tuple[parapy.geom.SubtractedSolid, parapy.geom.HalfSpaceSolid]
+    """
+    cog = solid.cog
+    half_space_solid = HalfSpaceSolid(Plane(Point(cog.x, cog.y, height),
+                                            'z', 'y'))
+    return SubtractedSolid(solid, half_space_solid), half_space_solid
+
+
+def volume_below(solid, height):
+    """ Return the volume of the part of a solid below a horizontal plane
+    at a certain height, or 0 if the boolean operation fails.
+
+    :rtype: float
+    """
+    try:
+        return abs(cut_at_height(solid, height)[0].volume)
+    except:
+        return 0.
+
+
+def height_bounds(solid):
+    """ Return the lowest and highest z-coordinates of the bounding box of a
+    solid.
+
+    :rtype: tuple[float]
+    """
+    heights = [vertex.point.z for vertex in solid.bbox.box.vertices]
+    return min(heights), max(heights)
+
+
+class FuelLevelTable(object):
+    """ The volume and centroid of the fuel in a tank as a function of the
+    height of its (horizontal) free surface. The table is sampled once with
+    OCC booleans (see :meth:`from_solid`); afterwards, the free-surface
+    height and the centre of gravity of any fuel volume are found by
+    interpolation.
+
+    :param heights: the (increasing) free-surface heights.
+    :type heights: collections.Sequence[float] | numpy.ndarray
+
+    :param volumes: the fuel volumes at these heights.
+    :type volumes: collections.Sequence[float] | numpy.ndarray
+
+    :param cogs: the (x, y, z) centroids of the fuel at these heights. The
+        centroid of an empty tank is not used.
+    :type cogs: collections.Sequence | numpy.ndarray
+    """
+
+    def __init__(self, heights, volumes, cogs):
+        self.heights = np.asarray(heights, dtype=float)
+        # Numerical noise of the booleans should not make the table
+        # non-monotone.
+        self.volumes = np.maximum.accumulate(np.asarray(volumes, dtype=float))
+        self.cogs = np.array(cogs, dtype=float)
+        # The centroid of an empty tank is taken as that of the lowest fuel
+        # layer.
+        i = np.searchsorted(self.volumes, 0., side='right')
+        self.cogs[:i] = self.cogs[min(i, len(self.cogs) - 1)]
+
+    @classmethod
+    def from_solid(cls, solid, n_levels=40):
+        """ Sample the table of a tank solid at n_levels equally spaced
+        heights between the bottom and the top of its bounding box.
+
+        :param solid: the solid of the tank.
+        :type solid: parapy.geom.occ.solid.Solid_
+
+        :param n_levels: the number of heights.
+        :type n_levels: int
+
+        :rtype: FuelLevelTable
+        """
+        bottom, top = height_bounds(solid)
+        heights = np.linspace(bottom, top, n_levels)
+
+        volumes, cogs = [0.], [tuple(solid.cog)]
+        for height in heights[1:-1]:
+            fuel_solid, _ = cut_at_height(solid, height)
+            try:
+                volumes.append(abs(fuel_solid.volume))
+                cogs.append(tuple(fuel_solid.cog))
+            except:
+                volumes.append(volumes[-1])
+                cogs.append(cogs[-1])
+        volumes.append(abs(solid.volume))
+        cogs.append(tuple(solid.cog))
+        return cls(heights, volumes, cogs)
+
+    @property
+    def max_volume(self):
+        """ :rtype: float """
+        return self.volumes[-1]
+
+    def height(self, volume):
+        """ Return the free-surface height(s) for (an array of) fuel
+        volume(s).
+
+        :rtype: float | numpy.ndarray
+        """
+        return np.interp(volume, self.volumes, self.heights)
+
+    def volume(self, height):
+        """ Return the fuel volume(s) for (an array of) free-surface
+        height(s).
+
+        :rtype: float | numpy.ndarray
+        """
+        return np.interp(height, self.heights, self.volumes)
+
+    def cog(self, volume):
+        """ Return the (x, y, z) centroid(s) of (an array of) fuel volume(s).
+        For an empty tank, the centroid of the lowest fuel layer is returned.
+
+        :rtype: numpy.ndarray
+        """
+        return np.array([np.interp(volume, self.volumes, cog)
+                         for cog in self.cogs.T]).T
+
+
+class PointLevelTable(object):
+    """ The cheapest fuel model of a tank: the fuel is a point mass at the
+    centroid of the tank solid, whatever its volume, and the free surface
+    rises linearly with the volume. It has the interface of a
+    :class:`FuelLevelTable`, but requires no boolean operations.
+
+    :param bottom: the height of the bottom of the tank.
+    :type bottom: float
+
+    :param top: the height of the top of the tank.
+    :type top: float
+
+    :param max_volume: the volume of the tank.
+    :type max_volume: float
+
+    :param cog: the (x, y, z) centroid of the tank.
+    :type cog: collections.Sequence[float]
+    """
+
+    def __init__(self, bottom, top, max_volume, cog):
+        self.bottom = bottom
+        self.top = top
+        self.max_volume = max_volume
+        self.centroid = np.array(cog, dtype=float)
+
+    @classmethod
+    def from_solid(cls, solid):
+        """ :rtype: PointLevelTable """
+        bottom, top = height_bounds(solid)
+        return cls(bottom, top, abs(solid.volume), tuple(solid.cog))
+
+    def height(self, volume):
+        """ :rtype: float | numpy.ndarray """
+        return self.bottom + (self.top - self.bottom) * np.clip(
+            np.asarray(volume, dtype=float) / self.max_volume, 0., 1.)
+
+    def volume(self, height):
+        """ :rtype: float | numpy.ndarray """
+        return self.max_volume * np.clip(
+            (np.asarray(height, dtype=float) - self.bottom) /
+            (self.top - self.bottom), 0., 1.)
+
+    def cog(self, volume):
+        """ Return the centroid of the tank, for (an array of) fuel
+        volume(s).
+
+        :rtype: numpy.ndarray
+        """
+        return np.tile(self.centroid, np.shape(volume) + (1, ))
+
+
+class ExactLevelTable(object):
+    """ The exact fuel model of a tank: every query is answered with OCC
+    booleans on the tank solid, the free-surface height being found by a
+    (warm-started) :class:`~classes.wing_primitives.fuel.free_surface.
+    FreeSurfaceSolver`. It has the interface of a :class:`FuelLevelTable`,
+    such that the same code can run on the exact model, e.g. to verify
+    results obtained with the tables.
+
+    :param solid: the solid of the tank.
+    :type solid: parapy.geom.occ.solid.Solid_
+
+    :param solver: the solver of the free-surface height.
+    :type solver: classes.wing_primitives.fuel.free_surface.FreeSurfaceSolver
+    """
+
+    def __init__(self, solid, solver):
+        self.solid = solid
+        self.solver = solver
+        self.max_volume = abs(solid.volume)
+
+    def height(self, volume):
+        """ :rtype: float """
+        return self.solver.solve(volume)
+
+    def volume(self, height):
+        """ :rtype: float """
+        return volume_below(self.solid, height)
+
+    def cog(self, volume):
+        """ Return the (x, y, z) centroid(s) of (an array of) fuel volume(s).
+        For an empty tank, the centroid of a thin bottom layer is returned.
+
+        :rtype: numpy.ndarray
+        """
+        if np.ndim(volume):
+            return np.array([self.cog(value) for value in volume])
+        volume = max(volume, self.solver.tolerance * self.max_volume)
+        if volume >= self.max_volume:
+            return np.array(tuple(self.solid.cog))
+        fuel_solid, _ = cut_at_height(self.solid, self.height(volume))
+        return np.array(tuple(fuel_solid.cog))
+
+
+class PitchLevelTable(object):
+    """ The volume and centroid of the fuel in a tank as a function of the
+    pitch angle of the aircraft, as well as of the height of the free
+    surface. It holds a :class:`FuelLevelTable` per pitch angle, with the
+    heights measured along the normal of the (tilted) free surface, and
+    interpolates linearly between the pitch angles. The tables are sampled
+    once (see :meth:`~classes.wing_primitives.fuel.tank_mesh.TankMesh.
+    pitch_level_table`), such that the attitude-correct centroid of the fuel
+    costs two table look-ups per pitch angle.
+
+    It has the interface of a :class:`FuelLevelTable`, with an additional
+    pitch angle, which defaults to zero (a horizontal free surface).
+
+    :param pitches: the (increasing) pitch angles in degrees.
+    :type pitches: collections.Sequence[float]
+
+    :param tables: the level table at every pitch angle.
+    :type tables: collections.Sequence[FuelLevelTable]
+    """
+
+    def __init__(self, pitches, tables):
+        self.pitches = np.asarray(pitches, dtype=float)
+        self.tables = list(tables)
+        if len(self.pitches) != len(self.tables) or not len(self.tables):
+            raise Exception('A PitchLevelTable needs one level table per '
+                            'pitch angle.')
+
+    @property
+    def max_volume(self):
+        """ :rtype: float """
+        return self.tables[0].max_volume
+
+    def _interpolate(self, method, value, pitch):
+        """ Evaluate a method of the level tables for (an array of) value(s)
+        and interpolate the results linearly in the pitch angle(s). Pitch
+        angles outside the tables are clamped.
+
+        :rtype: float | numpy.ndarray
+        """
+        value = np.asarray(value, dtype=float)
+        shape = value.shape
+        values = value.ravel()
+        pitches = np.broadcast_to(pitch, shape).ravel()
+        results = np.array([getattr(table, method)(values)
+                            for table in self.tables])
+        if len(self.tables) == 1:
+            result = results[0]
+        else:
+            i = np.clip(np.searchsorted(self.pitches, pitches,
+                                        side='right') - 1,
+                        0, len(self.pitches) - 2)
+            weights = np.clip((pitches - self.pitches[i]) /
+                              (self.pitches[i + 1] - self.pitches[i]),
+                              0., 1.)
+            weights = weights.reshape((-1, ) + (1, ) * (results.ndim - 2))
+            k = np.arange(len(values))
+            result = (1. - weights) * results[i, k] + \
+                weights * results[i + 1, k]
+        return result.reshape(shape + result.shape[1:])
+
+    def height(self, volume, pitch=0.):
+        """ Return the free-surface height(s), along the normal of the free
+        surface, for (an array of) fuel volume(s).
+
+        :rtype: float | numpy.ndarray
+        """
+        return self._interpolate('height', volume, pitch)
+
+    def volume(self, height, pitch=0.):
+        """ Return the fuel volume(s) for (an array of) free-surface
+        height(s).
+
+        :rtype: float | numpy.ndarray
+        """
+        return self._interpolate('volume', height, pitch)
+
+    def cog(self, volume, pitch=0.):
+        """ Return the (x, y, z) centroid(s) of (an array of) fuel volume(s)
+        at (an array of) pitch angle(s) in degrees.
+
+        :rtype: numpy.ndarray
+        """
+        return self._interpolate('cog', volume, pitch)
@@ -1,7 +1,16 @@
+import numpy as np
 from parapy.core import *
 from parapy.geom import *
 
-from classes.wing_primitives.fuel.fuel import Fuel
+from classes.wing_primitives.fuel.free_surface import FreeSurfaceSolver
+from classes.wing_primitives.fuel.fuel import Fuel, volume_below
+from classes.wing_primitives.fuel.fuel_level_table import (
+    ExactLevelTable, FuelLevelTable, PointLevelTable, height_bounds)
+from classes.wing_primitives.fuel.tank_mesh import TankMesh
+
+
+#: The fidelity levels of the fuel model, from cheap to exact.
+FUEL_FIDELITIES = ('point', 'table', 'exact')
 
 
 class FuelTank(SewnShell):
@@ -15,6 +24,13 @@ class FuelTank(SewnShell):
     color = Input('green')
     transparency = Input(0.6)
     tolerance = Input(1e-3)
+    n_fuel_levels = Input(40, validator=lambda x: isinstance(x, int) and x > 2)
+    fuel_level_method = Input('occ', validator=val.OneOf(['occ', 'mesh']))
+    #: The fidelity of the fuel model (see :any:`fuel_level_table`).
+    fuel_fidelity = Input('table', validator=val.OneOf(FUEL_FIDELITIES))
+    mesh_deflection = Input(1e-3, validator=val.is_positive)
+    #: The fuel flow drawn from this tank when it is used, in kg/s.
+    fuel_flow = Input(0., validator=val.Range(0, float('inf')))
 
     __initargs__ = ['wing', 'starting_rib_index', 'ending_rib_index']
 
@@ -78,11 +94,7 @@ class FuelTank(SewnShell):
 
         :rtype: list[wing_primitives.structural_elements.spar.SparSegment]
         """
-        return [spar_segment for spar_segment in self.front_spar.segments
-                if IntersectedShapes(self.starting_rib.rib_plane,
-                                     spar_segment).edges or
-                IntersectedShapes(self.ending_rib.rib_plane,
-                                  spar_segment).edges]
+        return self._segments_at_ribs(self.front_spar)
 
     @Attribute
     def rear_spar(self):
@@ -102,11 +114,22 @@ class FuelTank(SewnShell):
 
         :rtype: list[wing_primitives.structural_elements.spar.SparSegment]
         """
-        return [spar_segment for spar_segment in self.rear_spar.segments
-                if IntersectedShapes(self.starting_rib.rib_plane,
-                                     spar_segment).edges or
-                IntersectedShapes(self.ending_rib.rib_plane,
-                                  spar_segment).edges]
+        return self._segments_at_ribs(self.rear_spar)
+
+    def _segments_at_ribs(self, spar):
+        """ Return the segments of a spar crossed by the starting or the
+        ending rib plane, in spanwise order, found with the spanwise
+        interval index of the spar (see :meth:`~classes.wing_primitives.
+        structural_elements.spar.FusedSpar.segments_crossing`).
+
+        :type spar: classes.wing_primitives.structural_elements.spar.
+            FusedSpar
+
+        :rtype: list[wing_primitives.structural_elements.spar.SparSegment]
+        """
+        crossing = spar.segments_crossing(self.starting_rib.rib_plane) + \
+            spar.segments_crossing(self.ending_rib.rib_plane)
+        return [segment for segment in spar.segments if segment in crossing]
 
     @Attribute
     def spar_half_space_solids(self):
@@ -324,9 +347,120 @@ class FuelTank(SewnShell):
     def is_used(self):
         return self.fuel.initial_volume > 0.
 
+    @Attribute
+    def fuel_level_table(self):
+        """ The fuel volume and centroid versus free-surface height, at the
+        :any:`fuel_fidelity` (see :meth:`level_table`). As it only depends
+        on the tank geometry, it is shared by all fuel states.
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable
+            | classes.wing_primitives.fuel.tank_mesh.TankMesh
+        """
+        return self.level_table(self.fuel_fidelity)
+
+    def level_table(self, fidelity):
+        """ Return the fuel volume and centroid versus free-surface height at
+        a fidelity level. All levels have the same interface.
+
+        * 'point': the fuel is a point mass at the centroid of the tank
+          :any:`solid` (see :any:`point_level_table`).
+        * 'table': the :any:`interpolated_level_table`.
+        * 'exact': OCC booleans for every query (see
+          :any:`exact_level_table`).
+
+        :param fidelity: the fidelity level.
+        :type fidelity: str
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable
+            | classes.wing_primitives.fuel.tank_mesh.TankMesh
+        """
+        return getattr(self, {'point': 'point_level_table',
+                              'table': 'interpolated_level_table',
+                              'exact': 'exact_level_table'}[fidelity])
+
+    @Attribute
+    def point_level_table(self):
+        """ :rtype: classes.wing_primitives.fuel.fuel_level_table.
+            PointLevelTable
+        """
+        return PointLevelTable.from_solid(self.solid)
+
+    @Attribute
+    def interpolated_level_table(self):
+        """ If :any:`fuel_level_method` is 'occ', the volumes and centroids
+        are sampled once at :any:`n_fuel_levels` heights with OCC booleans.
+        If it is 'mesh', the :any:`mesh` is clipped at the free surface
+        directly.
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable
+            | classes.wing_primitives.fuel.tank_mesh.TankMesh
+        """
+        if self.fuel_level_method == 'mesh':
+            return self.mesh
+        return FuelLevelTable.from_solid(self.solid, self.n_fuel_levels)
+
+    def pitch_level_table(self, pitches):
+        """ Return the fuel volume and centroid versus free-surface height
+        and pitch angle, sampled once from the :any:`mesh` at
+        :any:`n_fuel_levels` heights per pitch angle.
+
+        :param pitches: the (increasing) pitch angles in degrees.
+        :type pitches: collections.Sequence[float]
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.
+            PitchLevelTable
+        """
+        return self.mesh.pitch_level_table(pitches, self.n_fuel_levels)
+
+    @Attribute
+    def exact_level_table(self):
+        """ :rtype: classes.wing_primitives.fuel.fuel_level_table.
+            ExactLevelTable
+        """
+        return ExactLevelTable(self.solid, self.free_surface_solver)
+
+    @Attribute
+    def mesh(self):
+        """ The triangle mesh of the tank :any:`solid`, tessellated once
+        with a maximum deflection of :any:`mesh_deflection`.
+
+        :rtype: classes.wing_primitives.fuel.tank_mesh.TankMesh
+        """
+        return TankMesh.from_solid(self.solid, self.mesh_deflection)
+
+    @Attribute
+    def free_surface_solver(self):
+        """ The warm-started solver for the exact free-surface height of the
+        fuel. As it only depends on the tank geometry, it is shared by all
+        fuel states and starts from the previous height.
+
+        :rtype: classes.wing_primitives.fuel.free_surface.FreeSurfaceSolver
+        """
+        bottom, top = height_bounds(self.solid)
+        return FreeSurfaceSolver(
+            lambda height: volume_below(self.solid, height), bottom, top,
+            abs(self.volume))
+
+    def check_mesh(self, n_heights=5):
+        """ Compare the fuel volumes and centroids of the :any:`mesh` with
+        the exact ones from OCC booleans, at n_heights free-surface heights.
+
+        :param n_heights: the number of heights that are compared.
+        :type n_heights: int
+
+        :return: the maximum relative volume error and the maximum centroid
+            distance.
+        :rtype: dict[str, float]
+        """
+        bottom, top = height_bounds(self.solid)
+        heights = np.linspace(bottom, top, n_heights + 2)[1:-1]
+        return self.mesh.cross_check(self.solid, heights)
+
     @Part
     def fuel(self):
-        return Fuel(self.solid)
+        return Fuel(self.solid, level_table=self.fuel_level_table,
+                    free_surface_solver=self.free_surface_solver,
+                    fuel_flow=self.fuel_flow)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,274 @@
+import numpy as np
+
+from classes.wing_primitives.fuel.free_surface import FreeSurfaceSolver
+from classes.wing_primitives.fuel.fuel_level_table import (FuelLevelTable,
+                                                            PitchLevelTable,
+                                                            cut_at_height)
+
+
+def triangulate(solid, deflection=1e-3):
+    """ Tessellate a solid with OCC, and return the vertices and the
+    (outward oriented) triangles of the mesh.
+
+    :param solid: the solid that is tessellated.
+    :type solid: parapy.geom.occ.solid.Solid_
+
+    :param deflection: the maximum distance between the mesh and the
+        surface of the solid.
+    :type deflection: float
+
+    :rtype: tuple[numpy.ndarray]
+    """
+    from OCC.BRep import BRep_Tool
+    from OCC.BRepMesh import BRepMesh_IncrementalMesh
+    from OCC.TopAbs import TopAbs_FACE, TopAbs_REVERSED
+    from OCC.TopExp import TopExp_Explorer
+    from OCC.TopLoc import TopLoc_Location
+    from OCC.TopoDS import topods_Face
+
+    shape = solid.TopoDS_Shape
+    BRepMesh_IncrementalMesh(shape, deflection)
+
+    vertices, triangles = [], []
+    explorer = TopExp_Explorer(shape, TopAbs_FACE)
+    while explorer.More():
+        face = topods_Face(explorer.Current())
+        location = TopLoc_Location()
+        handle = BRep_Tool.Triangulation(face, location)
+        explorer.Next()
+        if handle.IsNull():
+            continue
+        triangulation = handle.GetObject()
+        transformation = location.Transformation()
+
+        offset = len(vertices)
+        nodes = triangulation.Nodes()
+        for i in range(nodes.Lower(), nodes.Upper() + 1):
+            point = nodes.Value(i).Transformed(transformation)
+            vertices.append((point.X(), point.Y(), point.Z()))
+
+        reverse = face.Orientation() == TopAbs_REVERSED
+        face_triangles = triangulation.Triangles()
+        for i in range(face_triangles.Lower(), face_triangles.Upper() + 1):
+            n1, n2, n3 = face_triangles.Value(i).Get()
+            triangle = (n1, n3, n2) if reverse else (n1, n2, n3)
+            triangles.append([offset + n - nodes.Lower() for n in triangle])
+
+    return np.array(vertices, dtype=float), np.array(triangles, dtype=int)
+
+
+class TankMesh(object):
+    """ A closed triangle mesh of a tank solid, which computes the volume and
+    centroid of the fuel below a (tilted) free surface analytically.
+
+    The mesh is clipped against the plane of the free surface, and the
+    volume and centroid follow from the divergence theorem, as sums over
+    tetrahedra spanned by the clipped triangles and a reference point. As
+    the reference point is taken in the plane, the tetrahedra of the (flat)
+    free surface itself have no volume, such that the surface does not need
+    to be constructed.
+
+    The free surface is perpendicular to gravity. At a pitch angle theta
+    (nose up), its normal in the axis system of the aircraft is
+    (-sin(theta), 0, cos(theta)), and the 'height' of the surface is measured
+    along this normal (see :meth:`normal`). By default, the pitch is zero and
+    the surface is horizontal.
+
+    A mesh has the same interface as a
+    :class:`~classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable`,
+    such that it can serve as the level table of a
+    :class:`~classes.wing_primitives.fuel.fuel.Fuel`.
+
+    :param vertices: the (n, 3) vertices of the mesh.
+    :type vertices: numpy.ndarray
+
+    :param triangles: the (m, 3) vertex indices of the outward oriented
+        triangles.
+    :type triangles: numpy.ndarray
+
+    :param tolerance: the relative volume tolerance of :meth:`height`.
+    :type tolerance: float
+    """
+
+    def __init__(self, vertices, triangles, tolerance=1e-6):
+        self.corners = np.asarray(vertices, dtype=float)[triangles]
+        self.tolerance = tolerance
+        self.bottom = self.corners[..., 2].min()
+        self.top = self.corners[..., 2].max()
+        self.max_volume = self.clip(self.top)[0]
+        self.solver = FreeSurfaceSolver(self.volume, self.bottom, self.top,
+                                        self.max_volume, tolerance)
+
+    @classmethod
+    def from_solid(cls, solid, deflection=1e-3, tolerance=1e-6):
+        """ Tessellate a tank solid (see :func:`triangulate`).
+
+        :rtype: TankMesh
+        """
+        return cls(*triangulate(solid, deflection), tolerance=tolerance)
+
+    @staticmethod
+    def normal(pitch=0.):
+        """ Return the upward normal of the free surface at a pitch angle.
+
+        :param pitch: the pitch angle (nose up) in degrees.
+        :type pitch: float
+
+        :rtype: numpy.ndarray
+        """
+        theta = np.radians(pitch)
+        return np.array([-np.sin(theta), 0., np.cos(theta)])
+
+    def bounds(self, pitch=0.):
+        """ Return the lowest and highest height of the mesh along the
+        normal of the free surface at a pitch angle.
+
+        :rtype: tuple[float]
+        """
+        heights = self.corners.dot(self.normal(pitch))
+        return heights.min(), heights.max()
+
+    def clip(self, height, pitch=0.):
+        """ Return the volume and the centroid of the part of the mesh below
+        the plane of the free surface at a certain height.
+
+        :param height: the height of the plane along its normal; for zero
+            pitch, its z-coordinate.
+        :type height: float
+
+        :param pitch: the pitch angle (nose up) in degrees.
+        :type pitch: float
+
+        :rtype: tuple[float, numpy.ndarray]
+        """
+        normal = self.normal(pitch)
+        distances = self.corners.dot(normal) - height
+        below = distances <= 0.
+        n_below = below.sum(axis=1)
+
+        pieces = [self.corners[n_below == 3]]
+        for n, first in ((1, below), (2, ~below)):
+            selected = n_below == n
+            if not np.any(selected):
+                continue
+            # Rotate the corners (keeping their orientation), such that the
+            # odd one out comes first.
+            k = np.argmax(first[selected], axis=1)
+            rows = np.arange(len(k))[:, np.newaxis]
+            order = (k[:, np.newaxis] + np.arange(3)) % 3
+            p = self.corners[selected][rows, order]
+            d = distances[selected][rows, order]
+            p0, p1, p2 = p[:, 0], p[:, 1], p[:, 2]
+            p01 = self._intersect(p0, p1, d[:, 0], d[:, 1])
+            p20 = self._intersect(p2, p0, d[:, 2], d[:, 0])
+            if n == 1:
+                pieces.append(np.stack([p0, p01, p20], axis=1))
+            else:
+                pieces.append(np.stack([p01, p1, p2], axis=1))
+                pieces.append(np.stack([p01, p2, p20], axis=1))
+
+        triangles = np.concatenate(pieces)
+        if len(triangles) == 0:
+            return 0., np.full(3, np.nan)
+
+        # The centroid of the vertices, projected onto the plane.
+        centre = self.corners.reshape(-1, 3).mean(axis=0)
+        reference = centre - (centre.dot(normal) - height) * normal
+        a, b, c = (triangles[:, i] - reference for i in range(3))
+        volumes = np.einsum('ij,ij->i', a, np.cross(b, c)) / 6.
+        volume = volumes.sum()
+        if volume <= 0.:
+            return 0., np.full(3, np.nan)
+        cog = reference + (volumes[:, np.newaxis] * (a + b + c)).sum(
+            axis=0) / (4. * volume)
+        return volume, cog
+
+    @staticmethod
+    def _intersect(p, q, distance_p, distance_q):
+        """ Return the intersections of the edges p-q with a plane, for
+        edges crossing the plane, given the signed distances of their ends
+        to the plane.
+
+        :rtype: numpy.ndarray
+        """
+        t = distance_p / (distance_p - distance_q)
+        return p + t[:, np.newaxis] * (q - p)
+
+    def volume(self, height):
+        """ Return the fuel volume for a free-surface height.
+
+        :rtype: float
+        """
+        return self.clip(height)[0]
+
+    def height(self, volume):
+        """ Return the free-surface height for a fuel volume, found by the
+        warm-started :class:`~classes.wing_primitives.fuel.free_surface.
+        FreeSurfaceSolver` in :attr:`solver`.
+
+        :rtype: float
+        """
+        return self.solver.solve(volume)
+
+    def cog(self, volume):
+        """ Return the (x, y, z) centroid(s) of (an array of) fuel volume(s).
+        For an empty tank, the centroid of a thin bottom layer is returned.
+
+        :rtype: numpy.ndarray
+        """
+        if np.ndim(volume):
+            return np.array([self.cog(value) for value in volume])
+        volume = max(volume, self.tolerance * self.max_volume)
+        return self.clip(self.height(volume))[1]
+
+    def level_table(self, n_levels=200, pitch=0.):
+        """ Sample a level table from this mesh, at a pitch angle in
+        degrees. The heights of the table are measured along the normal of
+        the free surface.
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.FuelLevelTable
+        """
+        heights = np.linspace(*self.bounds(pitch), num=n_levels)
+        clipped = [self.clip(height, pitch) for height in heights]
+        return FuelLevelTable(heights, [volume for volume, _ in clipped],
+                              [cog for _, cog in clipped])
+
+    def pitch_level_table(self, pitches, n_levels=200):
+        """ Sample a level table at each of a number of pitch angles, such
+        that the centroid of the fuel can be interpolated in both the volume
+        and the pitch angle.
+
+        :param pitches: the (increasing) pitch angles in degrees.
+        :type pitches: collections.Sequence[float]
+
+        :param n_levels: the number of heights per pitch angle.
+        :type n_levels: int
+
+        :rtype: classes.wing_primitives.fuel.fuel_level_table.PitchLevelTable
+        """
+        return PitchLevelTable(pitches, [self.level_table(n_levels, pitch)
+                                         for pitch in pitches])
+
+    def cross_check(self, solid, heights):
+        """ Compare the volumes and centroids of this mesh with the exact
+        ones of the OCC solid, obtained with boolean operations.
+
+        :param solid: the tank solid of which this is the mesh.
+        :type solid: parapy.geom.occ.solid.Solid_
+
+        :param heights: the free-surface heights that are compared.
+        :type heights: collections.Sequence[float]
+
+        :return: the maximum relative volume error and the maximum centroid
+            distance.
+        :rtype: dict[str, float]
+        """
+        volume_errors, cog_errors = [], []
+        for height in heights:
+            volume, cog = self.clip(height)
+            fuel_solid, _ = cut_at_height(solid, height)
+            exact_volume = abs(fuel_solid.volume)
+            volume_errors.append(abs(volume - exact_volume) /
+                                 abs(solid.volume))
+            cog_errors.append(np.linalg.norm(cog - np.array(fuel_solid.cog)))
+        return {'volume': max(volume_errors), 'cog': max(cog_errors)}
@@ -118,15 +118,17 @@ class Rib(GeomBase):
 
     @Attribute
     def planes(self):
-        sorted_spars = sorted(self.wing.spars, key=lambda s: s.position.x)
-
-        for spar in sorted_spars[0].segments:
-            if IntersectedShapes(spar.web, self.rib_plane).edges:
-                front_cutter = spar.web_plane
+        """ Returns the web planes of the (outboard-most) segments of the
+        front and rear spar that are crossed by the rib plane, found with the
+        spanwise interval index of the spars.
 
-        for spar in sorted_spars[-1].segments:
-            if IntersectedShapes(spar.web, self.rib_plane).edges:
-                rear_cutter = spar.web_plane
+        :rtype: list[parapy.geom.occ.surface.Plane]
+        """
+        sorted_spars = sorted(self.wing.spars, key=lambda s: s.position.x)
+        front_cutter = sorted_spars[0].segments_crossing(
+            self.rib_plane)[-1].web_plane
+        rear_cutter = sorted_spars[-1].segments_crossing(
+            self.rib_plane)[-1].web_plane
         return [front_cutter, rear_cutter]
 
     @Attribute
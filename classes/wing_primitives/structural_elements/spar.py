@@ -1,3 +1,5 @@
+from bisect import bisect_left, bisect_right
+
 import numpy as np
 from parapy.core import *
 from parapy.geom import *
@@ -427,6 +429,89 @@ class FusedSpar(FusedShell):
             return [self.spar_segment.position,
                     self.spar_segment.web.point(1., 0.5)]
 
+    @Attribute
+    def span_direction(self):
+        """ The direction along which the spanwise intervals of the segments
+        are measured: the spanwise axis of the first wing segment.
+
+        :rtype: numpy.ndarray
+        """
+        segment = self.segments[0] if self.segments_is_iterable \
+            else self.segments
+        return np.array(tuple(segment.wing_segment.position.Vy))
+
+    @Attribute
+    def web_points(self):
+        """ The vertices of the web of every segment, as arrays of points.
+
+        :rtype: list[numpy.ndarray]
+        """
+        segments = self.segments if self.segments_is_iterable \
+            else [self.segments]
+        return [np.array([tuple(vertex.point)
+                          for vertex in segment.web.vertices])
+                for segment in segments]
+
+    @Attribute
+    def span_intervals(self):
+        """ The spanwise interval index of the segments: the (n, 2) lowest
+        and highest spanwise coordinate of the web of every segment. As the
+        segments follow each other along the span, both columns increase,
+        such that the segments in a spanwise range are found by bisection
+        (see :meth:`segments_crossing`).
+
+        :rtype: numpy.ndarray
+        """
+        coordinates = [points.dot(self.span_direction)
+                       for points in self.web_points]
+        return np.array([(c.min(), c.max()) for c in coordinates])
+
+    def segments_crossing(self, plane, tolerance=1e-6):
+        """ Return the segments of which the web is intersected by a plane,
+        e.g. a rib plane, in spanwise order.
+
+        The spanwise range of the plane over the webs follows from the web
+        vertices: every vertex is projected onto the plane along the
+        :any:`span_direction`. The segments of which the
+        :any:`span_intervals` overlap this range are found by bisection, and
+        only these candidates are confirmed with an OCC intersection. If
+        none is confirmed, all segments are tested.
+
+        :param plane: the intersecting plane.
+        :type plane: parapy.geom.occ.surface.Plane
+
+        :param tolerance: the spanwise tolerance of the candidate search,
+            relative to the span of the spar.
+        :type tolerance: float
+
+        :rtype: list[classes.wing_primitives.structural_elements.spar.
+            SparSegment]
+        """
+        segments = self.segments if self.segments_is_iterable \
+            else [self.segments]
+        normal = np.array(tuple(plane.normal))
+        reference = np.array(tuple(plane.reference))
+        points = np.concatenate(self.web_points)
+        along = normal.dot(self.span_direction)
+        if abs(along) < 1e-9:
+            # The plane is parallel to the span; no range can be bounded.
+            candidates = segments
+        else:
+            positions = points.dot(self.span_direction) - \
+                (points - reference).dot(normal) / along
+            margin = tolerance * self.span
+            lower, upper = self.span_intervals.T
+            first = bisect_left(list(upper), positions.min() - margin)
+            last = bisect_right(list(lower), positions.max() + margin)
+            candidates = segments[first:last]
+
+        crossing = [segment for segment in candidates
+                    if IntersectedShapes(segment.web, plane).edges]
+        if not crossing and len(candidates) < len(segments):
+            crossing = [segment for segment in segments
+                        if IntersectedShapes(segment.web, plane).edges]
+        return crossing
+
     def point(self, y_over_b_spar):
         # TODO check whether error in this function depends on wrong (u, v)
         #  parameter representation, or inherent function error.
@@ -5,9 +5,23 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from classes.aircraft import Aircraft
+from classes.analysis.burn_evaluation import ParallelBurnEvaluator
+from classes.analysis.mission_profile import MissionProfile, isa_altitude
+from classes.analysis.surrogate import (ResponseSurface, SurrogateAeroDatabase,
+                                        sample_designs)
+from tools.checkpoint import load_checkpoint, save_checkpoint
+from tools.invalidation import InvalidationGuard
+from tools.recorder import TimeHistoryReader, TimeHistoryRecorder
 from tools.read import import_aircraft_data
 
 
+#: The columns of the recorded time histories. Every row holds the state at
+#: time t, and the tank that is used from t until the next row.
+TIME_HISTORY_COLUMNS = [('t', float), ('CL', float), ('delta_e', float),
+                        ('CDi', float), ('alpha', float), ('Cm', float),
+                        ('cog', float), ('tank', 'S16')]
+
+
 class Main:
 
     path = os.path.join(os.getcwd(), 'input', 'aircraft_config.xlsx')
@@ -50,6 +64,11 @@ class Main:
         }
 
         self.time_histories = {}
+        self.time_history_path = os.path.join(
+            'output', '{}_time_histories'.format(name))
+        self.checkpoint_path = os.path.join(
+            'output', '{}_checkpoint.pkl'.format(name))
+        self.surrogate = None
 
     def show_geometry(self):
         """ Display the geometry in the ParaPy GUI.
@@ -60,7 +79,8 @@ class Main:
         display(self.aircraft)
 
     def minimize_tail_area(self, pos_min=0.3, pos_max=0.51, pos_step=0.05,
-                           show_plot=True, save_plot=True):
+                           show_plot=True, save_plot=True,
+                           fuel_fidelity=None):
         """ Minimise the tail area of this aircraft, by shifting the main
         wing position from pos_min to pos_max with increments
         of pos_step.
@@ -82,12 +102,21 @@ class Main:
         :param save_plot: should this plot be saved?
         :type save_plot: bool
 
+        :param fuel_fidelity: the fidelity of the fuel model during the
+            sweep (see :attr:`classes.aircraft.Aircraft.fuel_fidelity`).
+            Afterwards, the fidelity of the aircraft is restored. If None,
+            the fidelity of the aircraft is used.
+        :type fuel_fidelity: str
+
         :return: the minimum attainable tail area.
         :rtype: float
         """
         positions = np.arange(pos_min, pos_max, pos_step)
         self.tail_areas = {}
         t0 = time.time()
+        aircraft_fidelity = self.aircraft.fuel_fidelity
+        if fuel_fidelity is not None:
+            self.aircraft.fuel_fidelity = fuel_fidelity
 
         for position in positions:
             print 'Position: {} \n' \
@@ -106,6 +135,7 @@ class Main:
         min_dict = min(self.tail_areas.items(),
                        key=lambda i: i[1]['tail_area'])
         self.aircraft = min_dict[1]['aircraft']
+        self.aircraft.fuel_fidelity = aircraft_fidelity
         print 'Minimum tail area of {:.2f} m2 found for a longitudinal main ' \
               'wing position of {:.2f} in {:.1f} s.'.format(
                min_dict[1]['tail_area'], min_dict[0], time.time() - t0
@@ -157,6 +187,77 @@ class Main:
                   '_______________________________'.format(scale_factor - 1.,
                                                            current_area)
 
+    def make_design(self, main_wing_long_pos, tail_scale=1.):
+        """ Instantiate an aircraft from the input data with a different
+        main wing position and a scaled horizontal tail.
+
+        :param main_wing_long_pos: the longitudinal main wing position as a
+            fraction of the fuselage length.
+        :type main_wing_long_pos: float
+
+        :param tail_scale: the factor by which the horizontal tail chords and
+            span are scaled.
+        :type tail_scale: float
+
+        :rtype: Aircraft
+        """
+        data = dict(self.all_data)
+        data['main_wing_long_pos'] = main_wing_long_pos
+        data['ht_chords'] = [tail_scale * chord
+                             for chord in self.all_data['ht_chords']]
+        data['ht_span'] = tail_scale * self.all_data['ht_span']
+        return Aircraft(**data)
+
+    def build_surrogate(self, positions, tail_scales, degree=3, path=None):
+        """ Fit a response surface of CDtot, Cmtot and Alpha over (CL,
+        delta_e, main_wing_long_pos, tail_scale) to the AVL results of all
+        combinations of the given main wing positions and tail scales.
+
+        :param positions: the longitudinal main wing positions.
+        :type positions: collections.Sequence[float]
+
+        :param tail_scales: the scale factors of the horizontal tail.
+        :type tail_scales: collections.Sequence[float]
+
+        :param degree: the total degree of the polynomial.
+        :type degree: int
+
+        :param path: if given, the response surface is saved to this path.
+        :type path: str
+
+        :rtype: classes.analysis.surrogate.ResponseSurface
+        """
+        designs = [(position, tail_scale) for position in positions
+                   for tail_scale in tail_scales]
+        X, samples = sample_designs(self.make_design, designs)
+        self.surrogate = ResponseSurface(degree).fit(X, samples)
+        if path is not None:
+            self.surrogate.save(path)
+        return self.surrogate
+
+    def use_surrogate(self, surrogate=None, tail_scale=1.):
+        """ Serve the aerodynamic quantities of the current aircraft from a
+        response surface instead of the AVL results, by overriding its
+        aero database. The trim solver then uses the surrogate as well.
+
+        :param surrogate: the response surface, or the path of a saved one.
+            Defaults to the one fitted by :meth:`build_surrogate`.
+        :type surrogate: classes.analysis.surrogate.ResponseSurface | str
+
+        :param tail_scale: the scale factor of the horizontal tail of the
+            current aircraft.
+        :type tail_scale: float
+
+        :rtype: classes.analysis.surrogate.SurrogateAeroDatabase
+        """
+        if surrogate is None:
+            surrogate = self.surrogate
+        elif isinstance(surrogate, str):
+            surrogate = ResponseSurface.load(surrogate)
+        self.aircraft.aero_database = SurrogateAeroDatabase(
+            surrogate, self.aircraft.main_wing_long_pos, tail_scale)
+        return self.aircraft.aero_database
+
     def burn_symmetrically(self, tank_type, tank_no, delta_t):
         """ Burn fuel in the fuel tanks symmetrically. That is, burning from
         the main tank, with index 0 will cause fuel to be burnt from both
@@ -199,8 +300,41 @@ class Main:
 
         return t
 
+    def check_fuel_state_independence(self, tank_type='main', tank_no=0,
+                                      delta_t=1.):
+        """ Burn fuel from a tank, check that this has not invalidated any
+        of the :any:`Aircraft.fuel_independent_attributes` (such as the AVL
+        analysis, the aero database and the lofted geometry), and refuel the
+        tank.
+
+        :param tank_type: the type of tank: 'main', 'trim' or 'vert'.
+        :type tank_type: str
+
+        :param tank_no: the number of the tank.
+        :type tank_no: int
+
+        :param delta_t: the time during which fuel is burnt.
+        :type delta_t: float
+
+        :raises Exception: if any of the attributes has been invalidated.
+
+        :rtype: None
+        """
+        guard = InvalidationGuard(self.aircraft,
+                                  self.aircraft.fuel_independent_attributes)
+        time_burnt = self.burn_symmetrically(tank_type, tank_no, delta_t)
+        try:
+            self.aircraft.trim()
+            guard.check('burning fuel')
+        finally:
+            self.burn_symmetrically(tank_type, tank_no, -time_burnt)
+
     def optimize_fuel_usage(self, delta_t, end_condition='fuel_empty',
-                            end_time=np.inf, show_plot=True, save_plot=True):
+                            end_time=np.inf, show_plot=True, save_plot=True,
+                            check_invalidation=True, scheduler='greedy',
+                            beam_width=10, n_processes=1,
+                            checkpoint_every=0, checkpoint=None,
+                            fidelity_report=False):
         """ The function that optimizes the fuel tank usage to minimize
         (induced) trim drag. The function works in the following way.
 
@@ -216,6 +350,13 @@ class Main:
         #. Fuel is burnt from this optimum tank. Repeat to first step,
             but now for a non-initial condition and corresponding weight.
 
+        With the 'beam' scheduler, the tanks are instead taken from a
+        schedule of the whole mission, which minimises the time integral of
+        the induced drag. The 'event' scheduler makes the greedy choice with
+        variable time steps of at most delta_t, up to the next tank switch
+        (see :meth:`classes.aircraft.Aircraft.schedule_fuel_usage`). Every
+        step of a schedule is still trimmed on the aircraft.
+
         :param delta_t: the courseness of the time discretisation (the time
             step used for the analysis).
         :type delta_t: float
@@ -237,6 +378,43 @@ class Main:
             passed upon instantiating this Main object.
         :type save_plot: bool
 
+        :param check_invalidation: check after every time step that burning
+            fuel has not invalidated the AVL analysis, the aero database or
+            the geometry (see :meth:`check_fuel_state_independence`).
+        :type check_invalidation: bool
+
+        :param scheduler: 'greedy' to choose the tank with the lowest drag
+            at every step, or 'beam' or 'event' to follow a whole-mission
+            schedule.
+        :type scheduler: str
+
+        :param beam_width: the beam width of the 'beam' scheduler.
+        :type beam_width: int
+
+        :param n_processes: the number of worker processes in which the
+            candidate tanks of the 'greedy' scheduler are evaluated
+            concurrently (see :class:`~classes.analysis.burn_evaluation.
+            ParallelBurnEvaluator`). With 1 process, they are evaluated in
+            the current process.
+        :type n_processes: int
+
+        :param checkpoint_every: write a checkpoint to
+            :attr:`checkpoint_path` every checkpoint_every time steps, or
+            never if 0. See :meth:`resume`.
+        :type checkpoint_every: int
+
+        :param checkpoint: a checkpoint to continue from, of which the fuel
+            state and warm-start values have been restored. Use
+            :meth:`resume` instead.
+        :type checkpoint: dict
+
+        :param fidelity_report: print the discrepancy of the centre of
+            gravity between the fidelity levels of the fuel model at the end
+            (see :meth:`classes.aircraft.Aircraft.fuel_fidelity_report`).
+            This builds the level tables of all levels with OCC booleans, so
+            it is off by default.
+        :type fidelity_report: bool
+
         :rtype: None
         """
         def calculate_values():
@@ -246,37 +424,56 @@ class Main:
             """
             CL = self.aircraft.CL
             delta_e = self.aircraft.trim()
-            CDi = self.aircraft.get_CD(CL, delta_e)
-            alpha = self.aircraft.get_alpha(CL, delta_e)
-            Cm = self.aircraft.get_Cm(CL, delta_e)
+            CDi, alpha, Cm = self.aircraft.get_quantities(
+                CL, delta_e, quantities=('CDtot', 'Alpha', 'Cmtot'))
             cog = self.aircraft.cog.x
             return CL, delta_e, CDi, alpha, Cm, cog
 
-        def append_values():
+        def append_values(tank=''):
             """ Wrapper function for the append operations.
 
             :rtype: None
             """
-            self.time_histories['CL'].append(CL)
-            self.time_histories['delta_e'].append(delta_e)
-            self.time_histories['CDi'].append(CDi)
-            self.time_histories['alpha'].append(alpha)
-            self.time_histories['Cm'].append(Cm)
-            self.time_histories['cog'].append(cog)
+            recorder.append(t=t, CL=CL, delta_e=delta_e, CDi=CDi,
+                            alpha=alpha, Cm=Cm, cog=cog, tank=tank)
 
-        t = 0
+        def write_checkpoint():
+            """ Write a checkpoint of the current time step. The rows of the
+            recording that have not been flushed are stored in the
+            checkpoint, rather than written as a partial chunk.
 
-        # Clear and set up the time history lists.
-        self.time_histories = {'t': [0.], 'CL': [], 'delta_e': [], 'CDi': [],
-                               'alpha': [], 'Cm': [], 'tank': [], 'cog': []}
+            :rtype: None
+            """
+            save_checkpoint(self.checkpoint_path, {
+                'settings': settings, 'n': n, 't': t,
+                'n_chunks': recorder.n_chunks,
+                'buffered': recorder.buffered_rows(),
+                'masses': self.aircraft.fuel_state().masses,
+                'warm_start': self.aircraft.warm_start_values(),
+                'schedule': schedule})
+
+        settings = {'delta_t': delta_t, 'end_condition': end_condition,
+                    'end_time': end_time, 'scheduler': scheduler,
+                    'check_invalidation': check_invalidation,
+                    'beam_width': beam_width, 'n_processes': n_processes,
+                    'checkpoint_every': checkpoint_every,
+                    'fidelity_report': fidelity_report}
+        t, n, start_chunk, buffered, schedule = 0, 0, 0, None, None
+        if checkpoint is not None:
+            t, n = checkpoint['t'], checkpoint['n']
+            start_chunk = checkpoint['n_chunks']
+            buffered = checkpoint['buffered']
+            schedule = checkpoint['schedule']
+
+        # Set up the recording of the time histories, which are streamed to
+        # disk in chunks, such that the memory use does not grow with the
+        # number of time steps.
+        recorder = TimeHistoryRecorder(self.time_history_path,
+                                       TIME_HISTORY_COLUMNS,
+                                       start_chunk=start_chunk,
+                                       buffered=buffered)
 
         # Group the different sorts of tanks.
-        tanks = {
-            'main': range(len(self.aircraft.main_wing_port.fuel_tanks)),
-            'trim': range(len(
-                self.aircraft.horizontal_tail_starboard.fuel_tanks)),
-            'vert': range(len(self.aircraft.vertical_tail.fuel_tanks))
-        }
         main_tanks = self.aircraft.main_wing_starboard.fuel_tanks + \
             self.aircraft.main_wing_port.fuel_tanks
         trim_tanks = self.aircraft.horizontal_tail_port.fuel_tanks + \
@@ -284,67 +481,185 @@ class Main:
         vertical_tanks = self.aircraft.vertical_tail.fuel_tanks
         all_tanks = main_tanks + trim_tanks + vertical_tanks
 
-        n = 0
-
-        while (not all(tank.is_empty for tank in all_tanks) and
-               end_condition == 'fuel_empty') or \
-                (t < end_time and end_condition == 'time'):
-            n += 1
-            print '________________ n_iter = {} _________________'.format(n)
-            print 't = {}'.format(t)
-            tank_types = [
-                'main' * (not all(tank.is_empty for tank in main_tanks)),
-                'trim' * (not all(tank.is_empty for tank in trim_tanks)),
-                'vert' * (not all(tank.is_empty for tank in vertical_tanks))
-            ]
-
-            [tank_types.remove('') for _ in range(tank_types.count(''))]
-
-            CL, delta_e, CDi, alpha, Cm, cog = calculate_values()
-            append_values()
-
-            print 'CL: {},\ndelta_e: {},\nCDi: {},\nalpha: {},\nCm: {}'.format(
-                CL, delta_e, CDi, alpha, Cm
-            )
-
-            # Determine tapping from which tank gives the lowest drag
-            min_drag = np.inf
-            for tank_type in tank_types:
-                for tank_no in tanks[tank_type]:
+        if scheduler in ('beam', 'event') and schedule is None:
+            schedule = self.aircraft.schedule_fuel_usage(
+                delta_t, beam_width,
+                end_time if end_condition == 'time' else np.inf,
+                method=scheduler)
+            print 'Mission schedule: {} burns'.format(len(schedule.steps))
+            schedule = zip(schedule.groups, schedule.times)
+        elif scheduler != 'greedy':
+            msg = '{} is not recognised as a valid scheduler.'
+            raise NameError(msg.format(scheduler))
+
+        evaluator = self.aircraft.burn_evaluator
+        if scheduler == 'greedy' and n_processes > 1:
+            evaluator = ParallelBurnEvaluator(
+                evaluator, self.aircraft.fuel_model, n_processes)
+
+        guard = InvalidationGuard(
+            self.aircraft, self.aircraft.fuel_independent_attributes) \
+            if check_invalidation else None
+
+        # The worker processes of a parallel evaluator are stopped however
+        # the loop ends.
+        try:
+            while (not all(tank.is_empty for tank in all_tanks) and
+                   end_condition == 'fuel_empty') or \
+                    (t < end_time and end_condition == 'time'):
+                n += 1
+                print '________________ n_iter = {} ' \
+                      '_________________'.format(n)
+                print 't = {}'.format(t)
+                CL, delta_e, CDi, alpha, Cm, cog = calculate_values()
+
+                print 'CL: {},\ndelta_e: {},\nCDi: {},\nalpha: {},\n' \
+                      'Cm: {}'.format(CL, delta_e, CDi, alpha, Cm)
+
+                # Determine tapping from which tank gives the lowest drag.
+                # The burn from each of the non-empty tanks is evaluated on a
+                # copy of the fuel state, such that the aircraft itself is
+                # unchanged. A schedule also prescribes the duration of the
+                # burn.
+                if scheduler != 'greedy':
+                    if n > len(schedule):
+                        break
+                    group, step = schedule[n - 1]
+                else:
+                    step = delta_t
+                    state = self.aircraft.fuel_state()
+                    if not state.available_groups:
+                        break
+                    group = evaluator.best(state, delta_t)['group']
+                min_tank_type, min_tank_no = group.rsplit('_', 1)
+                min_tank_no = int(min_tank_no)
+
+                # Store the tank from which the fuel is eventually tapped as
+                # the tank that is used in this time interval.
+                append_values('{}_{}'.format(min_tank_type, min_tank_no))
+
+                print 'next best tank: {} {}'.format(min_tank_type,
+                                                     min_tank_no)
+
+                t += self.burn_symmetrically(min_tank_type, min_tank_no, step)
+
+                if guard is not None:
+                    guard.check('burning fuel')
+
+                if checkpoint_every and n % checkpoint_every == 0:
+                    write_checkpoint()
+        finally:
+            if isinstance(evaluator, ParallelBurnEvaluator):
+                evaluator.close()
+
+        CL, delta_e, CDi, alpha, Cm, cog = calculate_values()
+        append_values()
+        recorder.close()
+        self.time_histories = TimeHistoryReader(self.time_history_path)
+        print t
+        if fidelity_report:
+            report = self.aircraft.fuel_fidelity_report(
+                reference=self.aircraft.fuel_fidelity)
+            print 'Fuel cog discrepancy w.r.t. the {} model: {}'.format(
+                self.aircraft.fuel_fidelity,
+                ', '.join('{}: {:.2e} m'.format(level,
+                                                report[level]['discrepancy'])
+                          for level in sorted(report)))
+        # The level tables of the 'point' and 'table' fidelities (other than
+        # a mesh) interpolate the height, without a solver.
+        stats = self.aircraft.free_surface_stats()
+        if stats['calls']:
+            print 'Free-surface solver: {calls} solves, {evaluations} ' \
+                  'volume evaluations ({mean_evaluations:.1f} per ' \
+                  'solve)'.format(**stats)
+        if show_plot:
+            self.plot_time_histories(delta_t, save_plot=save_plot)
 
-                    # Burn fuel from each tank and calculate required
-                    # elevator deflection and resulting induced drag.
-                    time = self.burn_symmetrically(tank_type, tank_no, delta_t)
-                    delta_e = self.aircraft.trim()
-                    drag = self.aircraft.get_CD(self.aircraft.CL, delta_e)
+    def resume(self, checkpoint=None, show_plot=True, save_plot=True):
+        """ Continue an :meth:`optimize_fuel_usage` run from a checkpoint.
+        The fuel masses and the warm-start values of the solvers are
+        restored directly, rather than by replaying the burns, and the
+        recording of the time histories is continued after the rows that
+        were recorded up to the checkpoint.
 
-                    # If burning from this tank results in the least amount
-                    # of drag, store its value
-                    if drag < min_drag:
-                        min_drag = drag
-                        min_tank_no = tank_no
-                        min_tank_type = tank_type
+        :param checkpoint: the checkpoint, or the file name of one. Defaults
+            to :attr:`checkpoint_path`.
+        :type checkpoint: dict | str
 
-                    # 'Refuel' the tank, in case burning fuel from this tank
-                    # does not deliver the minimum induced drag.
-                    self.burn_symmetrically(tank_type, tank_no, -time)
+        :param show_plot: should the plot be shown?
+        :type show_plot: bool
 
-            # Store the tank from which the fuel is eventually tapped as the
-            # tank that is used in this time interval.
-            self.time_histories['tank'].append('{}_{}'.format(min_tank_type,
-                                                              min_tank_no))
+        :param save_plot: should the plot be saved to the output folder?
+        :type save_plot: bool
 
-            print 'next best tank: {} {}'.format(min_tank_type, min_tank_no)
+        :rtype: None
+        """
+        if checkpoint is None:
+            checkpoint = self.checkpoint_path
+        if not isinstance(checkpoint, dict):
+            checkpoint = load_checkpoint(checkpoint)
+
+        self.aircraft.set_fuel_state(
+            self.aircraft.fuel_model.state(checkpoint['masses']))
+        self.aircraft.set_warm_start_values(checkpoint['warm_start'])
+        print 'Resuming at t = {} (n_iter = {})'.format(checkpoint['t'],
+                                                       checkpoint['n'])
+        self.optimize_fuel_usage(show_plot=show_plot, save_plot=save_plot,
+                                 checkpoint=checkpoint,
+                                 **checkpoint['settings'])
+
+    def simulate_mission(self, max_step, mission_profile=None,
+                         method='event', show_plot=True, save_plot=True):
+        """ Simulate the fuel usage over a mission profile with a scheduler
+        (see :meth:`classes.aircraft.Aircraft.schedule_fuel_usage`), and
+        store the time histories of the schedule. Unlike
+        :meth:`optimize_fuel_usage`, no fuel is burnt on the aircraft: every
+        segment is evaluated with its own CL and fuel flows on the
+        (precomputed) aero database.
+
+        :param max_step: the maximum time step in s.
+        :type max_step: float
+
+        :param mission_profile: the mission profile. Defaults to a standard
+            profile of 8 hours of cruise at the velocity and air density of
+            the aircraft.
+        :type mission_profile: classes.analysis.mission_profile.MissionProfile
+
+        :param method: the scheduling method, 'event' or 'beam'.
+        :type method: str
 
-            t += self.burn_symmetrically(min_tank_type, min_tank_no, delta_t)
+        :param show_plot: should the plot be shown?
+        :type show_plot: bool
 
-            self.time_histories['t'].append(t)
+        :param save_plot: should the plot be saved to the output folder?
+        :type save_plot: bool
 
-        calculate_values()
-        append_values()
-        print t
+        :rtype: classes.analysis.tank_scheduler.Schedule
+        """
+        if mission_profile is None:
+            mission_profile = MissionProfile.standard(
+                isa_altitude(self.aircraft.air_density),
+                self.aircraft.velocity, 8 * 3600.)
+        schedule = self.aircraft.schedule_fuel_usage(
+            max_step, method=method, mission_profile=mission_profile)
+
+        t = 0.
+        with TimeHistoryRecorder(self.time_history_path,
+                                 TIME_HISTORY_COLUMNS +
+                                 [('segment', 'S16')]) as recorder:
+            for step in schedule.steps + [schedule.final]:
+                recorder.append(t=t, tank=step.get('group', ''),
+                                segment=step.get('segment', ''),
+                                **dict((key, step[key]) for key, _
+                                       in TIME_HISTORY_COLUMNS[1:-1]))
+                t += step.get('time', 0.)
+        self.time_histories = TimeHistoryReader(self.time_history_path)
+
+        print 'Mission of {} segments: {} burns, integrated CDi: {}'.format(
+            len(mission_profile.segments), len(schedule.steps), schedule.cost)
         if show_plot:
-            self.plot_time_histories(delta_t, save_plot=save_plot)
+            self.plot_time_histories(max_step, save_plot=save_plot)
+        return schedule
 
     def plot_time_histories(self, delta_t, save_plot=True):
         """ A function used to plot the most important time histories of the
@@ -361,6 +676,8 @@ class Main:
         :rtype: None
         """
         time = self.time_histories['t']
+        # The last row holds the final state, in which no tank is used.
+        tanks = self.time_histories['tank'][:len(time) - 1]
 
         fig, axes = plt.subplots(7, 1, True)
         fig.set_size_inches(8.3, 11.7)
@@ -392,13 +709,10 @@ class Main:
         axes[4].set_ylabel('$C_m [-]$')
         axes[4].grid(which='both')
 
-        labels = sorted(set(self.time_histories['tank']),
-                        key=lambda s: self.format_func(s))
-        y_ticks = sorted({self.format_func(s)
-                          for s in self.time_histories['tank']})
+        labels = sorted(set(tanks), key=lambda s: self.format_func(s))
+        y_ticks = sorted({self.format_func(s) for s in tanks})
 
-        for t1, t2, tank in zip(time[:-1], time[1:],
-                                self.time_histories['tank']):
+        for t1, t2, tank in zip(time[:-1], time[1:], tanks):
             axes[5].plot([t1, t2],
                          [self.format_func(tank), self.format_func(tank)],
                          color='C0')
@@ -447,7 +761,8 @@ class Main:
 if __name__ == '__main__':
     t0 = time.time()
     main = Main('conv-mid-wing')
-    main.minimize_tail_area(.4, .5, .1, show_plot=True)
+    main.minimize_tail_area(.4, .5, .1, show_plot=True,
+                            fuel_fidelity='point')
     main.converge_tail_area()
     main.optimize_fuel_usage(50., show_plot=True)
     # main.plot_time_histories()
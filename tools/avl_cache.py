@@ -0,0 +1,226 @@
+""" A persistent, content-addressed cache of AVL results.
+
+The key of an entry is a hash of the AVL configuration (surfaces, sections,
+airfoils, controls, reference values and Mach number) and the list of run
+cases. Entries are stored as pickle files in a cache directory, such that
+re-instantiating a known design (in a new session) loads its AVL results
+from disk instead of running AVL again.
+"""
+import hashlib
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+
+# Increase this number whenever the layout of the stored results changes,
+# such that old entries are no longer used.
+CACHE_VERSION = 1
+
+# The attributes that are read from the AVL primitives (configuration,
+# surfaces, sections, airfoils, controls, cases and parameters) to build the
+# fingerprint. Attributes that an object does not have are skipped.
+FINGERPRINT_FIELDS = (
+    'name', 'mach', 'reference_area', 'reference_chord', 'reference_span',
+    'reference_point', 'surfaces', 'bodies', 'n_chordwise', 'chord_spacing',
+    'n_spanwise', 'span_spacing', 'y_duplicate', 'angle', 'component',
+    'sections', 'leading_edge_point', 'position', 'chord', 'airfoil',
+    'points', 'controls', 'gain', 'x_hinge', 'duplicate_sign',
+    'hinge_vector', 'settings', 'value', 'constraint'
+)
+
+
+def fingerprint(obj, _seen=None):
+    """ Return a canonical, hashable representation of (a tree of) AVL
+    primitives, consisting of only built-in types.
+
+    :param obj: the object to represent.
+
+    :rtype: tuple | list | float | str | None
+    """
+    if obj is None or isinstance(obj, (bool, str, type(u''))):
+        return obj
+    if isinstance(obj, (int, float, np.number)):
+        return round(float(obj), 10)
+    if isinstance(obj, np.ndarray):
+        return fingerprint(obj.tolist(), _seen)
+    if isinstance(obj, dict):
+        return tuple((str(key), fingerprint(value, _seen))
+                     for key, value in sorted(obj.items()))
+
+    _seen = set() if _seen is None else _seen
+    if id(obj) in _seen:
+        return '<cycle>'
+    _seen = _seen | {id(obj)}
+
+    # Positions are represented by their location and axis system.
+    if hasattr(obj, 'location') and hasattr(obj, 'Vx'):
+        return ('Position',) + tuple(fingerprint(getattr(obj, attr), _seen)
+                                     for attr in ('location', 'Vx', 'Vy',
+                                                  'Vz'))
+    if isinstance(obj, (list, tuple)) or (hasattr(obj, '__iter__') and
+                                          not hasattr(obj, 'name')):
+        return tuple(fingerprint(item, _seen) for item in obj)
+
+    fields = tuple((field, fingerprint(getattr(obj, field), _seen))
+                   for field in FINGERPRINT_FIELDS if hasattr(obj, field))
+    return (obj.__class__.__name__,) + fields
+
+
+def configuration_key(configuration, cases):
+    """ Return the cache key of an AVL configuration and its run cases.
+
+    :param configuration: the AVL configuration.
+    :type configuration: kbeutils.avl.Configuration
+
+    :param cases: the AVL run cases.
+    :type cases: list[kbeutils.avl.Case]
+
+    :rtype: str
+    """
+    data = (CACHE_VERSION, fingerprint(configuration), fingerprint(cases))
+    return hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
+
+
+class AVLCache(object):
+    """ A directory of pickled AVL results, keyed by
+    :func:`configuration_key`.
+
+    Entries that are older than ``max_age`` seconds are evicted, after which
+    the least recently used entries are evicted until the total size of the
+    cache is below ``max_size`` bytes.
+
+    :param directory: the directory in which the results are stored. It is
+        created when it does not exist.
+    :type directory: str
+
+    :param max_size: the maximum total size of the cache in bytes.
+    :type max_size: float
+
+    :param max_age: the maximum age of an entry in seconds.
+    :type max_age: float
+    """
+
+    EXTENSION = '.pkl'
+
+    def __init__(self, directory, max_size=200e6, max_age=30 * 24 * 3600.):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def path(self, key):
+        """ Return the path of the file of a cache entry.
+
+        :rtype: str
+        """
+        return os.path.join(self.directory, key + self.EXTENSION)
+
+    @property
+    def entries(self):
+        """ Return the paths of all entries, least recently used first.
+
+        :rtype: list[str]
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, filename)
+                 for filename in os.listdir(self.directory)
+                 if filename.endswith(self.EXTENSION)]
+        return sorted(paths, key=os.path.getmtime)
+
+    def load(self, key):
+        """ Return the results stored under a key, or None if there are no
+        (valid) results stored.
+
+        :rtype: dict | None
+        """
+        path = self.path(key)
+        if not os.path.isfile(path):
+            return None
+        if time.time() - os.path.getmtime(path) > self.max_age:
+            os.remove(path)
+            return None
+        try:
+            with open(path, 'rb') as f:
+                results = pickle.load(f)
+        except Exception:
+            # A corrupt or incompatible entry is treated as a cache miss.
+            os.remove(path)
+            return None
+        # Mark the entry as recently used.
+        os.utime(path, None)
+        return results
+
+    def save(self, key, results):
+        """ Store results under a key and evict old entries afterwards.
+
+        :rtype: None
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        path = self.path(key)
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(results, f, protocol=2)
+        except (pickle.PicklingError, TypeError) as error:
+            warnings.warn('AVL results could not be cached: {}'.format(error))
+            os.remove(path + '.tmp')
+            return
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(path + '.tmp', path)
+        self.evict()
+
+    def evict(self):
+        """ Remove the entries that are too old, then remove the least
+        recently used entries until the cache is within its maximum size.
+
+        :rtype: None
+        """
+        now = time.time()
+        entries = []
+        for path in self.entries:
+            if now - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+            else:
+                entries.append(path)
+
+        total_size = sum(os.path.getsize(path) for path in entries)
+        while entries and total_size > self.max_size:
+            path = entries.pop(0)
+            total_size -= os.path.getsize(path)
+            os.remove(path)
+
+    def clear(self):
+        """ Remove all entries from the cache.
+
+        :rtype: None
+        """
+        for path in self.entries:
+            os.remove(path)
+
+    def get_or_run(self, configuration, cases, run, refresh=False):
+        """ Return the cached results of an AVL configuration and its run
+        cases, or run AVL and store its results.
+
+        :param configuration: the AVL configuration.
+        :type configuration: kbeutils.avl.Configuration
+
+        :param cases: the AVL run cases.
+        :type cases: list[kbeutils.avl.Case]
+
+        :param run: a function without arguments, returning the AVL results.
+        :type run: () -> dict
+
+        :param refresh: force AVL to be run, replacing the cached results.
+        :type refresh: bool
+
+        :rtype: dict
+        """
+        key = configuration_key(configuration, cases)
+        results = None if refresh else self.load(key)
+        if results is None:
+            results = run()
+            self.save(key, results)
+        return results
@@ -0,0 +1,111 @@
+""" Parallel execution of AVL run cases.
+
+The list of run cases is partitioned into chunks, each of which is run as
+an independent AVL analysis in a worker process with its own (temporary)
+working directory. The results of all chunks are merged into a single
+mapping from case name to results, identical to the ``results`` of a single
+``avl.Interface`` run with all cases.
+"""
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import warnings
+
+
+def run_cases(configuration, cases):
+    """ The default runner: run a set of cases with a single AVL analysis.
+
+    :param configuration: the AVL configuration.
+    :type configuration: kbeutils.avl.Configuration
+
+    :param cases: the AVL run cases.
+    :type cases: list[kbeutils.avl.Case]
+
+    :rtype: dict
+    """
+    import kbeutils.avl as avl
+    return dict(avl.Interface(cases=cases,
+                              configuration=configuration).results)
+
+
+def partition(cases, n_chunks):
+    """ Partition the cases into (at most) n_chunks contiguous chunks of
+    nearly equal size.
+
+    :type cases: list
+    :type n_chunks: int
+
+    :rtype: list[list]
+    """
+    n_chunks = max(1, min(n_chunks, len(cases)))
+    size, remainder = divmod(len(cases), n_chunks)
+    chunks, start = [], 0
+    for i in range(n_chunks):
+        end = start + size + (1 if i < remainder else 0)
+        chunks.append(cases[start:end])
+        start = end
+    return chunks
+
+
+def _run_chunk(args):
+    """ Run one chunk of cases in a fresh working directory. This function
+    is executed in the worker processes.
+
+    :rtype: dict
+    """
+    runner, configuration, chunk = args
+    working_directory = tempfile.mkdtemp(prefix='avl_')
+    cwd = os.getcwd()
+    try:
+        os.chdir(working_directory)
+        return runner(configuration, chunk)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(working_directory, ignore_errors=True)
+
+
+def run_parallel(configuration, cases, n_processes, runner=run_cases):
+    """ Run the cases of a configuration in a pool of n_processes
+    independent AVL analyses and merge their results.
+
+    For testing, any picklable module-level function with the signature of
+    :func:`run_cases` can be supplied as ``runner``, for example one that
+    calls a local fake AVL executable.
+
+    :param configuration: the AVL configuration.
+    :type configuration: kbeutils.avl.Configuration
+
+    :param cases: the AVL run cases.
+    :type cases: list[kbeutils.avl.Case]
+
+    :param n_processes: the number of worker processes. With 1 process,
+        the cases are run in the current process.
+    :type n_processes: int
+
+    :param runner: the function running a list of cases.
+    :type runner: (kbeutils.avl.Configuration, list) -> dict
+
+    :rtype: dict
+    """
+    if n_processes <= 1 or len(cases) <= 1:
+        return runner(configuration, cases)
+
+    chunks = partition(cases, n_processes)
+    pool = multiprocessing.Pool(len(chunks))
+    try:
+        chunk_results = pool.map(_run_chunk, [(runner, configuration, chunk)
+                                              for chunk in chunks])
+    except (pickle.PicklingError, TypeError) as error:
+        warnings.warn('The AVL cases could not be distributed over worker '
+                      'processes ({}); running them serially.'.format(error))
+        return runner(configuration, cases)
+    finally:
+        pool.close()
+        pool.join()
+
+    results = {}
+    for chunk_result in chunk_results:
+        results.update(chunk_result)
+    return results
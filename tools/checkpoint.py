@@ -0,0 +1,67 @@
+""" Checkpoints of long simulations.
+
+A checkpoint is a small dictionary of built-in types and NumPy arrays, such
+as the time, the fuel masses and the warm-start values of the solvers. It is
+pickled to a temporary file, which then replaces the previous checkpoint,
+such that a crash while writing never leaves a corrupt checkpoint behind.
+On POSIX, the rename replaces the previous checkpoint atomically. On
+Windows, where a rename cannot replace a file, the previous checkpoint is
+first moved to a backup, from which :func:`load_checkpoint` reads if the
+process died before the new checkpoint was in place.
+"""
+import os
+import pickle
+
+# Increase this number whenever the layout of the checkpoints changes, such
+# that old checkpoints are no longer resumed.
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(path, checkpoint):
+    """ Write a checkpoint, replacing the previous one at the same path.
+
+    :param path: the file name of the checkpoint.
+    :type path: str
+
+    :param checkpoint: the values to store.
+    :type checkpoint: dict
+
+    :rtype: None
+    """
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    checkpoint = dict(checkpoint, version=CHECKPOINT_VERSION)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(checkpoint, f, protocol=2)
+    backup = path + '.bak'
+    if os.name == 'nt' and os.path.exists(path):
+        if os.path.exists(backup):
+            os.remove(backup)
+        os.rename(path, backup)
+    os.rename(path + '.tmp', path)
+    if os.path.exists(backup):
+        os.remove(backup)
+
+
+def load_checkpoint(path):
+    """ Read a checkpoint.
+
+    :param path: the file name of the checkpoint. If it does not exist, its
+        backup (see :func:`save_checkpoint`) is read instead.
+    :type path: str
+
+    :raises Exception: if the checkpoint was written by an incompatible
+        version.
+
+    :rtype: dict
+    """
+    if not os.path.exists(path) and os.path.exists(path + '.bak'):
+        path += '.bak'
+    with open(path, 'rb') as f:
+        checkpoint = pickle.load(f)
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        msg = 'Checkpoint {} has version {}, expected {}.'
+        raise Exception(msg.format(path, checkpoint.get('version'),
+                                   CHECKPOINT_VERSION))
+    return checkpoint
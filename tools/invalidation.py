@@ -0,0 +1,81 @@
+""" Instrumentation of unintended invalidations of (lazy) ParaPy attributes.
+
+A ParaPy attribute is evaluated once and its value is kept until one of the
+slots it depends on changes. When it is evaluated again, a new object is
+returned. Comparing the identities of attribute values before and after an
+operation therefore reveals which of them were invalidated by it, for example
+whether burning fuel caused the AVL configuration to be rebuilt.
+"""
+
+
+def resolve(obj, path):
+    """ Return the value of a dotted attribute path, e.g.
+    ``'main_wing_starboard.fuel_tanks[0].solid'``, of an object.
+
+    :type obj: object
+    :type path: str
+    """
+    for name in path.split('.'):
+        name, _, index = name.partition('[')
+        obj = getattr(obj, name)
+        if index:
+            obj = obj[int(index.rstrip(']'))]
+    return obj
+
+
+class InvalidationGuard(object):
+    """ Records a set of attribute values of an object, such that it can
+    later be checked which of them have been recomputed. The values
+    themselves are kept (rather than their ids), such that an invalidated
+    value cannot be garbage collected and have its id reused by its
+    replacement.
+
+    :param obj: the object owning the attributes.
+    :type obj: object
+
+    :param paths: the dotted paths of the guarded attributes.
+    :type paths: collections.Sequence[str]
+    """
+
+    def __init__(self, obj, paths):
+        self.obj = obj
+        self.paths = tuple(paths)
+        self.values = {}
+        self.n_checks = 0
+        self.record()
+
+    def record(self):
+        """ (Re-)record the guarded attribute values. Note that attributes
+        which have not been evaluated yet are evaluated.
+
+        :rtype: None
+        """
+        self.values = dict((path, resolve(self.obj, path))
+                           for path in self.paths)
+
+    def changed(self):
+        """ Return the paths of the attributes whose values have been
+        recomputed since they were recorded.
+
+        :rtype: list[str]
+        """
+        return [path for path in self.paths
+                if resolve(self.obj, path) is not self.values[path]]
+
+    def check(self, operation='the operation'):
+        """ Raise an exception if any of the guarded attributes has been
+        recomputed since they were recorded.
+
+        :param operation: a description of the operation that was performed,
+            used in the error message.
+        :type operation: str
+
+        :rtype: None
+        """
+        self.n_checks += 1
+        changed = self.changed()
+        if changed:
+            raise Exception('{} invalidated the following attributes, which '
+                            'should be independent of it: {}'
+                            .format(operation.capitalize(),
+                                    ', '.join(changed)))
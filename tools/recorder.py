@@ -0,0 +1,173 @@
+""" A streaming recorder of time histories, with columnar output on disk.
+
+Every step of a simulation is appended as a row to preallocated NumPy
+buffers, one per column. When the buffers are full, they are written to disk
+as a chunk (an ``.npz`` file with one array per column), and reused. Memory
+use is therefore bounded by the chunk size, and everything up to the last
+flushed chunk survives a crash. A :class:`TimeHistoryReader` reads the
+chunks back lazily, one column at a time.
+"""
+import glob
+import os
+
+import numpy as np
+
+#: The file name pattern of the chunks in a recording directory.
+CHUNK_PATTERN = 'chunk_{:06d}.npz'
+
+
+class TimeHistoryRecorder(object):
+    """ Records rows of named values into fixed-size chunks on disk.
+
+    :param path: the directory to which the chunks are written. Chunks of a
+        previous recording in this directory are removed, from
+        ``start_chunk`` on.
+    :type path: str
+
+    :param columns: the names and the NumPy dtypes of the columns, e.g.
+        ``[('t', float), ('tank', 'S16')]``.
+    :type columns: collections.Sequence[tuple]
+
+    :param chunk_size: the number of rows per chunk.
+    :type chunk_size: int
+
+    :param start_chunk: the number of chunks of a previous recording that
+        are kept, to continue that recording (e.g. from a checkpoint). The
+        rows of this recorder are counted from there.
+    :type start_chunk: int
+
+    :param buffered: the rows of a previous recording that were not yet
+        flushed when it was checkpointed (see :meth:`buffered_rows`). They
+        are buffered again.
+    :type buffered: dict[str, numpy.ndarray]
+    """
+
+    def __init__(self, path, columns, chunk_size=1000, start_chunk=0,
+                 buffered=None):
+        self.path = path
+        self.columns = [name for name, _ in columns]
+        self.chunk_size = chunk_size
+        self.buffers = dict((name, np.empty(chunk_size, dtype=dtype))
+                            for name, dtype in columns)
+        self.n_rows = 0
+        self.n_chunks = start_chunk
+        self._n_buffered = 0
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        for filename in glob.glob(os.path.join(path, 'chunk_*.npz')):
+            if int(os.path.basename(filename)[6:-4]) >= start_chunk:
+                os.remove(filename)
+        if buffered:
+            for i in range(len(buffered[self.columns[0]])):
+                self.append(**dict((name, values[i])
+                                   for name, values in buffered.items()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, **row):
+        """ Append a row. Columns that are not given keep the value of the
+        previous row in the same place of the buffer, so all columns should
+        be given.
+
+        :rtype: None
+        """
+        i = self._n_buffered
+        for name, value in row.items():
+            self.buffers[name][i] = value
+        self._n_buffered += 1
+        self.n_rows += 1
+        if self._n_buffered == self.chunk_size:
+            self.flush()
+
+    def buffered_rows(self):
+        """ Return a copy of the rows that have not been flushed yet, such
+        that they can be stored in a checkpoint without writing a (partial)
+        chunk.
+
+        :rtype: dict[str, numpy.ndarray]
+        """
+        return dict((name, buffer[:self._n_buffered].copy())
+                    for name, buffer in self.buffers.items())
+
+    def flush(self):
+        """ Write the buffered rows to a new chunk.
+
+        :rtype: None
+        """
+        if not self._n_buffered:
+            return
+        filename = os.path.join(self.path,
+                                CHUNK_PATTERN.format(self.n_chunks))
+        np.savez(filename, **dict((name, buffer[:self._n_buffered])
+                                  for name, buffer in self.buffers.items()))
+        self.n_chunks += 1
+        self._n_buffered = 0
+
+    def close(self):
+        """ Flush the remaining rows.
+
+        :rtype: None
+        """
+        self.flush()
+
+
+class TimeHistoryReader(object):
+    """ Reads the chunks of a :class:`TimeHistoryRecorder` lazily: a column
+    is only loaded when it is requested, as in ``reader['t']``.
+
+    :param path: the directory of the recording.
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def chunks(self):
+        """ The file names of the chunks, in the order of recording.
+
+        :rtype: list[str]
+        """
+        return sorted(glob.glob(os.path.join(self.path, 'chunk_*.npz')))
+
+    def keys(self):
+        """ :rtype: list[str] """
+        chunks = self.chunks
+        if not chunks:
+            return []
+        with np.load(chunks[0]) as chunk:
+            return list(chunk.files)
+
+    def __contains__(self, name):
+        return name in self.keys()
+
+    def __len__(self):
+        keys = self.keys()
+        return len(self[keys[0]]) if keys else 0
+
+    def iter_chunks(self, columns):
+        """ Yield the columns of every chunk, one chunk at a time.
+
+        :param columns: the names of the columns to read.
+        :type columns: collections.Sequence[str]
+
+        :rtype: collections.Iterator[dict[str, numpy.ndarray]]
+        """
+        for filename in self.chunks:
+            with np.load(filename) as chunk:
+                yield dict((name, chunk[name]) for name in columns)
+
+    def __getitem__(self, name):
+        """ Return a whole column.
+
+        :rtype: numpy.ndarray
+        """
+        arrays = [chunk[name] for chunk in self.iter_chunks([name])]
+        if not arrays:
+            raise KeyError(name)
+        return np.concatenate(arrays)